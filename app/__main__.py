@@ -0,0 +1,53 @@
+"""統一入口：在 repo 根目錄執行 python -m app <子命令> [參數]
+
+    update     下載缺的小時 → 合併 → 輸出 docs/data（= app/ci_update.py，每小時排程用這個）
+    export     不下載，只用 data/store 現有資料重新輸出 docs/data
+    plot       批次輸出 docs/charts 的 24h / 7d 圖（render_charts.py）
+    stations   查測站名冊、產生 stations.csv 列（station_registry.py）
+    backfill   長期歷史回補（backfill.py）
+    serve      本地查詢 API：多站、任意區間、伺服器端降採樣（api_server.py）
+    daemon     近即時常駐：輪詢即時資料，新觀測一出來就更新 docs/data（daemon.py）
+
+各子命令要用到才 import 對應模組：pandas 只有下載到新預報時才載入，matplotlib 只有 plot 會載入。
+子命令模組的 import 耗時記在 .cache/metrics.json 的 stages.import。
+"""
+import os, sys, time
+
+T0 = time.perf_counter()
+# app/ 底下的模組彼此用扁平 import（from fetcher import ...），和直接跑 python app/xxx.py 時一樣
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metrics
+
+COMMANDS = {
+    "update":   ("ci_update", lambda m: m.run()),
+    "export":   ("ci_update", lambda m: m.run(fetch=False)),
+    "plot":     ("render_charts", lambda m: m.main()),
+    "stations": ("station_registry", lambda m: m.main()),
+    "backfill": ("backfill", lambda m: m.main()),
+    "serve":    ("api_server", lambda m: m.main()),
+    "daemon":   ("daemon", lambda m: m.main()),
+}
+NO_ARGS = {"update", "export"}     # 設定走環境變數（EXPORT_DAYS、HOURS_PER_RUN…），不吃參數
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__.strip(), file=sys.stderr)
+        raise SystemExit(0 if sys.argv[1:2] in (["-h"], ["--help"]) else 2)
+    cmd, rest = sys.argv[1], sys.argv[2:]
+    if cmd in NO_ARGS and rest:
+        raise SystemExit(f"{cmd} 不接受參數（設定請用環境變數）：{' '.join(rest)}")
+    sys.argv = [f"python -m app {cmd}", *rest]       # 讓各模組的 argparse 照常運作
+
+    try:                                             # 本機開發時讀 .env；CI 直接用環境變數
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    name, call = COMMANDS[cmd]
+    with metrics.stage("import"):
+        mod = __import__(name)
+    metrics.set_info(command=cmd, startup_s=round(time.perf_counter() - T0, 3))
+    call(mod)
+
+if __name__ == "__main__":
+    main()
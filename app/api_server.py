@@ -0,0 +1,292 @@
+"""本地查詢 API（選用）：直接讀 data/store 與 .cache/derived，不需要任何外部服務
+
+    python -m app serve --port 8080
+    curl 'http://127.0.0.1:8080/api/series?sids=C0F9N0,C0FA50&start=2026-09-01&end=2026-10-01&points=300'
+
+- GET /api/stations                     stations.csv 的測站與各站最新時刻
+- GET /api/series?sids=A,B&start=&end=&fields=temp,rh,rain&points=500&method=minmax|lttb
+    start / end：ISO 日期或時刻（台北時間；end 當天整天都算），預設為最新往回 7 天
+    fields：temp / rh / rain（時雨量）/ dew / hi（露點、熱指數，見 derived.py）
+    method=minmax（預設）：依區間聚合成不超過 points 格（1/2/3/6/12/24 小時或整數天，對齊台北時間），
+        輸出 v2 區塊（t0 + step）；溫濕度等欄位給 <欄位>_min / <欄位>_max，雨量給區間加總；區間剛好一小時時就是原始值。
+    method=lttb：每個欄位各自以 Largest-Triangle-Three-Buckets 挑出 points 個點，
+        輸出 {欄位: {"t": [epoch 秒], "v": [...]}}（時間不等距）。
+- 回應帶 ETag（內容雜湊；gzip 版本是另一個表示法，ETag 加上 -gz）與 Vary: Accept-Encoding；
+  If-None-Match 相同回 304。
+- 熱門查詢的結果（含 gzip 版本）留在記憶體 LRU；鍵包含查詢參數與相關月份檔的 mtime，
+  資料一寫入就自然失效。
+"""
+import os, csv, gzip, json, hashlib, argparse, threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from station_store import StationStore, TZ, to_hour, hour_to_dt
+from derived import DerivedStore
+from tiers import bucket_start, hourly_rain
+from payload import VERSION, columnar
+import metrics
+
+HOST = os.getenv("API_HOST", "127.0.0.1")
+PORT = int(os.getenv("API_PORT", "8080"))
+CACHE_ENTRIES = int(os.getenv("API_CACHE_ENTRIES", "256"))
+MAX_STATIONS = int(os.getenv("API_MAX_STATIONS", "50"))
+MAX_POINTS = int(os.getenv("API_MAX_POINTS", "5000"))
+DEFAULT_DAYS = 7
+
+RAW, DERIVED = ("temp", "rh", "rain"), ("dew", "hi")
+WIDTHS = (1, 2, 3, 6, 12, 24)
+SUMMED = {"rain"}                 # 聚合時加總、而不是取 min / max 的欄位
+
+class BadRequest(ValueError):
+    pass
+
+def lttb(x, y, n):
+    """Largest-Triangle-Three-Buckets：從 (x, y) 挑 n 個點，保留視覺上的峰谷（x 遞增、不含 NaN）"""
+    if n >= len(x) or n < 3:
+        return np.arange(len(x))
+    edges = np.linspace(1, len(x) - 1, n - 1).astype(np.int64)   # 中間 n-2 個桶的邊界（頭尾各自成一點）
+    # 每桶的平均點一次算好（第 i 桶要看的是第 i+1 桶的平均；最後一桶看終點）
+    bounds = np.append(edges, len(x))
+    cnt = np.diff(bounds)
+    mx = np.append(np.add.reduceat(x, bounds[:-1]) / cnt, x[-1])[1:]
+    my = np.append(np.add.reduceat(y, bounds[:-1]) / cnt, y[-1])[1:]
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1], a = 0, len(x) - 1, 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = mx[i], my[i]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = keep[i + 1] = lo + int(np.argmax(area))
+    return keep
+
+def minmax_buckets(hours, cols, width):
+    """逐時資料 → width 小時一格（台北時間對齊）的 min / max（SUMMED 欄位為加總）"""
+    b = bucket_start(hours, width)
+    starts, first = np.unique(b, return_index=True)
+    out = {}
+    if not len(starts):
+        return starts, out
+    for f, v in cols.items():
+        ok = ~np.isnan(v)
+        n = np.add.reduceat(ok.astype(int), first)
+        if f in SUMMED:
+            out[f] = np.where(n > 0, np.add.reduceat(np.where(ok, v, 0.0), first), np.nan)
+        else:
+            with np.errstate(invalid="ignore"):
+                out[f + "_min"] = np.fmin.reduceat(v, first)
+                out[f + "_max"] = np.fmax.reduceat(v, first)
+    return starts, out
+
+def _width(start, end, points):
+    """聚合寬度（小時）：1/2/3/6/12/24 或整數天，取對齊台北時間後格數不超過 points 的最小者"""
+    w = 1
+    while (bucket_start(end, w) - bucket_start(start, w)) // w + 1 > points:
+        w = WIDTHS[WIDTHS.index(w) + 1] if w in WIDTHS[:-1] else w + 24
+    return w
+
+def gzip_etag(tag):
+    """同一內容的 gzip 表示法用不同的強 ETag（RFC 9110 8.8.3；"abc" → "abc-gz"）"""
+    return tag[:-1] + '-gz"'
+
+def _parse_time(s, end=False):
+    try:
+        if len(s) == 10:                                   # YYYY-MM-DD；end 取當天最後一小時
+            h = to_hour(datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=TZ))
+            return h + 23 if end else h
+        return to_hour(s)
+    except ValueError:
+        raise BadRequest(f"看不懂的時間：{s}")
+
+def _nums(v):
+    """陣列 → JSON 用的 list（兩位小數，NaN → None）；整批 round 比逐個 round(float) 快很多"""
+    out = np.round(v, 2).tolist()
+    for i in np.flatnonzero(np.isnan(v)).tolist():
+        out[i] = None
+    return out
+
+class SeriesService:
+    """查詢本身（與 HTTP 無關，bench 也直接用）：讀 store → 降採樣 → JSON bytes，結果進 LRU"""
+
+    def __init__(self, stations, store=None, derived=None, cache_entries=CACHE_ENTRIES):
+        self.stations = {s["sid"]: s for s in stations}
+        self.store, self.derived = store or StationStore(), derived or DerivedStore()
+        self.cache, self.cache_entries, self._lock = OrderedDict(), cache_entries, threading.Lock()
+
+    def _read(self, sid, start, end, fields):
+        """[start, end] 的逐時格（缺的小時為 NaN）→ (hours, {欄位: 陣列})"""
+        grid = np.arange(start, end + 1)
+        cols = {}
+        if any(f in RAW for f in fields):
+            hours, recs = self.store.read(sid, start - 1, end)     # 多讀一小時才算得出第一格的時雨量
+            raw = {"temp": recs["temp"], "rh": recs["rh"], "rain": hourly_rain(hours, recs["precip"])}
+            keep = hours >= start
+            for f in fields:
+                if f in RAW:
+                    cols[f] = np.full(len(grid), np.nan)
+                    cols[f][hours[keep] - start] = raw[f][keep]
+        if any(f in DERIVED for f in fields):
+            hours, recs = self.derived.hourly.read(sid, start, end)
+            for f in fields:
+                if f in DERIVED:
+                    cols[f] = np.full(len(grid), np.nan)
+                    cols[f][hours - start] = recs[f]
+        return grid, {f: cols[f] for f in fields}
+
+    def _station(self, sid, start, end, fields, points, method):
+        grid, cols = self._read(sid, start, end, fields)
+        if method == "lttb":
+            out = {}
+            for f, v in cols.items():
+                ok = np.flatnonzero(~np.isnan(v))
+                x, y = grid[ok].astype(float), v[ok]
+                idx = lttb(x, y, points)
+                out[f] = {"t": (grid[ok][idx] * 3600).tolist(), "v": _nums(y[idx])}
+            return out
+        width = _width(start, end, points)
+        if width == 1:
+            return columnar((grid * 3600).tolist(), {f: _nums(v) for f, v in cols.items()}, 3600)
+        starts, agg = minmax_buckets(grid, cols, width)
+        return columnar((starts * 3600).tolist(), {k: _nums(v) for k, v in agg.items()}, width * 3600)
+
+    def query(self, params):
+        """params：parse_qs 的結果 → (etag, body, gzip body)"""
+        one = lambda k, d=None: (params.get(k) or [d])[0]
+        sids = [s for s in (one("sids") or "").split(",") if s]
+        if not sids:
+            raise BadRequest("請給 sids=測站1,測站2")
+        if len(sids) > MAX_STATIONS:
+            raise BadRequest(f"一次最多 {MAX_STATIONS} 站")
+        unknown = [s for s in sids if s not in self.stations]
+        if unknown:
+            raise BadRequest(f"不在 stations.csv 的測站：{','.join(unknown)}")
+        fields = [f for f in (one("fields") or "temp,rh,rain").split(",") if f]
+        bad = [f for f in fields if f not in RAW + DERIVED]
+        if bad:
+            raise BadRequest(f"不支援的欄位：{','.join(bad)}")
+        method = one("method", "minmax")
+        if method not in ("minmax", "lttb"):
+            raise BadRequest("method 只能是 minmax 或 lttb")
+        try:
+            points = min(MAX_POINTS, max(3, int(one("points", "500"))))
+        except ValueError:
+            raise BadRequest("points 要是整數")
+
+        end = _parse_time(one("end"), end=True) if one("end") else \
+            max((h for h in map(self.store.last_hour, sids) if h is not None), default=None)
+        if end is None:
+            raise BadRequest("這些測站還沒有資料")
+        start = _parse_time(one("start")) if one("start") else end - DEFAULT_DAYS * 24 + 1
+        if start > end:
+            raise BadRequest("start 晚於 end")
+
+        # 快取鍵：正規化後的查詢 + 相關月份檔的 mtime（資料有寫入就換鍵）
+        stamp = tuple((self.store.stamp(s, start, end), self.derived.hourly.stamp(s, start, end)) for s in sids)
+        key = (tuple(sids), start, end, tuple(fields), points, method, stamp)
+        with self._lock:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.cache.move_to_end(key)
+        if hit is not None:
+            metrics.count("api_cache", result="hit")
+            return hit
+        metrics.count("api_cache", result="miss")
+
+        payload = {"v": VERSION, "start": hour_to_dt(start).isoformat(), "end": hour_to_dt(end).isoformat(),
+                   "method": method, "points": points,
+                   "stations": {sid: self._station(sid, start, end, fields, points, method) for sid in sids}}
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = ('"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"', body, gzip.compress(body, 6))
+        with self._lock:
+            self.cache[key] = entry
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        return entry
+
+    def station_list(self):
+        out = []
+        for sid, s in self.stations.items():
+            h = self.store.last_hour(sid)
+            out.append({**s, "latest": hour_to_dt(h).isoformat() if h is not None else None})
+        return json.dumps({"stations": out}, ensure_ascii=False).encode("utf-8")
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 標頭與內容分兩次寫出；keep-alive 下沒關 Nagle 會卡在 delayed ACK，每個回應多約 40 ms
+        disable_nagle_algorithm = True
+
+        def log_message(self, *a):
+            pass
+
+        def send(self, code, body=b"", etag=None, gz=None):
+            """gz：同一份內容預先壓好的 gzip 版本；用戶端接受就改送它，ETag 也換成 gzip 版本的"""
+            use_gz = gz is not None and "gzip" in (self.headers.get("Accept-Encoding") or "")
+            self.send_response(code)
+            if etag:
+                self.send_header("ETag", gzip_etag(etag) if use_gz else etag)
+                self.send_header("Cache-Control", "no-cache")        # 每次都帶 If-None-Match 回來驗證
+            if gz is not None:
+                self.send_header("Vary", "Accept-Encoding")          # 304 也要帶，快取才分得清兩種表示法
+            if code != 304:
+                body = gz if use_gz else body
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                if use_gz:
+                    self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body) if code != 304 else 0))
+            self.end_headers()
+            if code != 304:
+                self.wfile.write(body)
+
+        def error(self, code, msg):
+            self.send(code, json.dumps({"error": msg}, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            try:
+                if u.path == "/api/stations":
+                    return self.send(200, service.station_list())
+                if u.path != "/api/series":
+                    return self.error(404, "只有 /api/stations 與 /api/series")
+                with metrics.stage("api_query"):
+                    etag, body, gz = service.query(parse_qs(u.query))
+            except BadRequest as e:
+                return self.error(400, str(e))
+            except Exception as e:
+                print(f"[error] {u.path}：{type(e).__name__}: {e}")
+                return self.error(500, type(e).__name__)
+            # 兩種表示法內容相同：用戶端手上有哪一份都算沒變
+            sent = [t.strip() for t in (self.headers.get("If-None-Match") or "").split(",")]
+            if etag in sent or gzip_etag(etag) in sent:
+                metrics.count("api_responses", status=304)
+                return self.send(304, etag=etag, gz=gz)
+            metrics.count("api_responses", status=200)
+            self.send(200, body, etag, gz)
+
+    return Handler
+
+def load_stations(path="app/stations.csv"):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def make_server(host=HOST, port=PORT, service=None):
+    srv = ThreadingHTTPServer((host, port), make_handler(service or SeriesService(load_stations())))
+    srv.daemon_threads = True
+    return srv
+
+def main():
+    ap = argparse.ArgumentParser(description="本地查詢 API（讀 data/store）")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    args = ap.parse_args()
+    srv = make_server(args.host, args.port)
+    print(f"[api] http://{args.host}:{srv.server_address[1]}/api/series", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
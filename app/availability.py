@@ -0,0 +1,108 @@
+import os, json, time
+from fetcher import BASE_URL, get_sync
+from station_store import to_hour, hour_to_dt
+import metrics
+
+META_URL = f"{BASE_URL}/historyapi/v1/getMetadata/O-A0001-001"
+CACHE_PATH = os.getenv("AVAILABILITY_CACHE", ".cache/availability.json")   # 空字串 = 不用索引，照舊逐小時試
+REFRESH_MIN = float(os.getenv("AVAILABILITY_REFRESH_MIN", "10"))          # 多久內不重抓 getMetadata
+
+def hour_ranges(hours):
+    """排序過的 epoch 小時 → [[起, 迄], ...] 連續區段（存檔用，幾年份也只有幾百段）"""
+    out = []
+    for h in hours:
+        if out and h == out[-1][1] + 1:
+            out[-1][1] = h
+        else:
+            out.append([h, h])
+    return out
+
+class AvailabilityIndex:
+    """historyapi getMetadata 列出的「已發布小時」→ 本地索引（.cache/availability.json）
+
+    歷史檔只會增加不會消失，所以每次 refresh 都是把新清單併進舊索引；
+    planner 只下載索引裡有的小時，不必再靠 404 去試哪些小時還沒生成。
+    """
+
+    def __init__(self, path=CACHE_PATH, refresh_min=REFRESH_MIN):
+        self.path, self.refresh_after = path, refresh_min * 60
+        self.fetched, self.stale, self.hours = 0.0, False, set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                j = json.load(f)
+            self.fetched = j.get("fetched", 0.0)
+            self.hours = {h for a, b in j.get("ranges", []) for h in range(a, b + 1)}
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def earliest(self):
+        """最早可下載的 epoch 小時（長期回補的起點）；索引是空的回 None"""
+        return min(self.hours) if self.hours else None
+
+    @property
+    def latest(self):
+        return max(self.hours) if self.hours else None
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched": self.fetched, "ranges": hour_ranges(sorted(self.hours))}, f)
+        os.replace(tmp, self.path)
+
+    def refresh(self):
+        """抓一次 getMetadata 併入索引；失敗回 False 並標記為 stale（呼叫端改回逐小時試）"""
+        try:
+            r = get_sync(META_URL, params={"Authorization": os.getenv("CWA_TOKEN")}, timeout=30)
+            r.raise_for_status()
+            times = r.json()["dataset"]["resources"]["resource"]["data"]["time"]
+            new = {to_hour(t["DateTime"]) for t in times}
+        except Exception as e:
+            print(f"[warn] getMetadata 失敗（{type(e).__name__}）；這次不靠可用清單，照舊逐小時下載")
+            metrics.count("availability", result="failed")
+            self.stale = True
+            return False
+        added = len(new - self.hours)
+        self.hours |= new
+        self.fetched, self.stale = time.time(), False
+        self._save()
+        metrics.count("availability", result="refreshed")
+        metrics.count("availability_new_hours", added)
+        return True
+
+    def ensure(self, upto=None):
+        """索引涵蓋不到 upto（epoch 小時）且已過了 refresh 間隔 → 重抓"""
+        if upto is not None and self.latest is not None and upto <= self.latest:
+            return True
+        if time.time() - self.fetched < self.refresh_after:
+            metrics.count("availability", result="cached")
+            return True
+        return self.refresh()
+
+    def filter(self, wanted):
+        """只留下確定已發布的小時。索引更新失敗（stale）時，比已知最新還新的小時照樣保留去試。"""
+        if not wanted:
+            return []
+        self.ensure(to_hour(wanted[-1]))
+        if not self.hours:
+            return list(wanted)
+        latest = self.latest
+        return [dt for dt in wanted
+                if (h := to_hour(dt)) in self.hours or (self.stale and h > latest)]
+
+    def last(self, n):
+        """最近 n 個已發布的小時（台北時間 datetime，舊 → 新）"""
+        self.ensure()
+        return [hour_to_dt(h) for h in sorted(self.hours)[-n:]]
+
+_default = None
+
+def default_index():
+    """全程式共用一個實例；AVAILABILITY_CACHE 設成空字串時回 None"""
+    global _default
+    if _default is None and CACHE_PATH:
+        _default = AvailabilityIndex()
+    return _default
@@ -0,0 +1,160 @@
+"""長期歷史回補：把一段日期範圍的逐時觀測直接寫進 data/store。
+
+    python app/backfill.py --days 90                 # 最近 90 天
+    python app/backfill.py --since 2025-01-01 --until 2025-06-30
+    python app/backfill.py --since earliest --max-minutes 40
+
+- 依 --chunk-hours 分批（新 → 舊）；每個小時處理完就寫進 store 並記在 .cache/backfill.json，
+  被取消或逾時後重跑會從斷點繼續（store 已有全部測站資料的小時、以及已確認沒有檔案的小時都會跳過）。
+- 自己一組限速（--rate / --concurrency），不會吃光每小時排程要用的 API 額度。
+- --max-minutes 到了就在批次之間收手，留時間給 workflow 提交結果。
+- 結束後補算衍生指標（derived.py），並重算受影響測站的多解析度檔（docs/data/<sid>.h1/.h3/.d1.json）。
+"""
+import os, csv, json, time, signal, asyncio, argparse
+from datetime import datetime
+from fetcher import FetchEngine
+from ingest import ingest_hours_async
+from planner import have_hours
+from station_store import StationStore, TZ, to_hour, hour_to_dt
+from availability import AvailabilityIndex, hour_ranges
+from tiers import export_tiers
+from derived import DerivedStore
+
+CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", ".cache/backfill.json")
+RATE = float(os.getenv("BACKFILL_RATE", "2"))                 # 每秒請求數上限
+CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "3"))
+
+class Checkpoint:
+    """已處理完的小時（包含檔案不存在、或快照裡沒有這些測站的小時）
+
+    只對同一組測站有效：stations.csv 變了就重來（有資料的小時仍會因 store 已有而跳過）。
+    """
+
+    def __init__(self, sids, path=CHECKPOINT):
+        self.path, self.sids, self.done = path, sorted(sids), set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                j = json.load(f)
+            if j.get("sids") == self.sids:
+                self.done = {h for a, b in j.get("done", []) for h in range(a, b + 1)}
+        except (OSError, ValueError):
+            pass
+
+    def __contains__(self, h):
+        return h in self.done
+
+    def add(self, h):
+        self.done.add(h)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sids": self.sids, "done": hour_ranges(sorted(self.done))}, f)
+        os.replace(tmp, self.path)
+
+def plan(store, sids, start, end, ckpt, avail=None):
+    """[start, end] 內還要下載的 epoch 小時（新 → 舊）"""
+    hours = range(start, end + 1)
+    if avail is not None and avail.hours:
+        hours = [h for h in hours if h in avail.hours]
+    complete = None
+    for sid in sids:
+        have = have_hours(store, sid, start, end)
+        complete = have if complete is None else complete & have
+    complete = complete or set()
+    return [h for h in reversed(hours) if h not in ckpt and h not in complete]
+
+async def run(todo, sids, store, ckpt, chunk, rate, concurrency, deadline):
+    """逐批下載；回傳 {sid: 寫入的最早小時}"""
+    engine = FetchEngine(concurrency=concurrency, rate=rate, burst=max(1, int(rate)))
+    since = {}
+
+    def on_hour(dt, found):
+        h = to_hour(dt)
+        for sid in sids:
+            rec = found.get(sid.upper())
+            if rec is not None:
+                store.upsert(sid, [rec])
+                since[sid] = min(h, since.get(sid, h))
+        ckpt.add(h)
+
+    try:
+        for i in range(0, len(todo), chunk):
+            if deadline and time.monotonic() > deadline:
+                print(f"[backfill] 已達時間上限，剩 {len(todo) - i} 小時留待下次")
+                break
+            part = [hour_to_dt(h) for h in todo[i:i + chunk]]
+            await ingest_hours_async(part, sids, engine=engine, report=False, on_hour=on_hour)
+            ckpt.save()
+            print(f"[backfill] {min(i + chunk, len(todo))}/{len(todo)} 小時"
+                  f"（{part[-1]:%Y-%m-%d %H}–{part[0]:%Y-%m-%d %H} 時）", flush=True)
+    finally:
+        ckpt.save()
+        engine.close()
+        engine.stats.report("回補")
+    return since
+
+def _parse_day(s):
+    return datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=TZ)
+
+def _stop(signum, frame):
+    # Actions 取消時送 SIGINT / SIGTERM：轉成例外，讓 finally 存好斷點
+    raise KeyboardInterrupt
+
+def main():
+    ap = argparse.ArgumentParser(description="長期歷史回補（可中斷、可續跑）")
+    ap.add_argument("--since", help="YYYY-MM-DD，或 earliest = getMetadata 列出的最早小時")
+    ap.add_argument("--until", help="YYYY-MM-DD（含當天；預設到現在）")
+    ap.add_argument("--days", type=int, default=90, help="沒給 --since 時往回幾天")
+    ap.add_argument("--sids", nargs="*", help="預設為 app/stations.csv 內所有測站")
+    ap.add_argument("--chunk-hours", type=int, default=24)
+    ap.add_argument("--rate", type=float, default=RATE)
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--max-minutes", type=float, default=float(os.getenv("BACKFILL_MAX_MINUTES", "0")),
+                    help="時間預算（0 = 不限）")
+    ap.add_argument("--no-export", action="store_true", help="只寫 store，不重新輸出多解析度檔")
+    args = ap.parse_args()
+
+    with open("app/stations.csv", newline="", encoding="utf-8") as f:
+        stations = [row for row in csv.DictReader(f) if not args.sids or row["sid"] in args.sids]
+    sids = [s["sid"] for s in stations]
+
+    avail = AvailabilityIndex()
+    avail.ensure()
+    end = to_hour(_parse_day(args.until)) + 23 if args.until else to_hour(datetime.now(TZ))
+    if args.since == "earliest":
+        if avail.earliest is None:
+            raise SystemExit("getMetadata 取不到可用清單，無法決定 earliest；請改給日期")
+        start = avail.earliest
+    else:
+        start = to_hour(_parse_day(args.since)) if args.since else end - args.days * 24 + 1
+
+    store, ckpt = StationStore(), Checkpoint(sids)
+    todo = plan(store, sids, start, end, ckpt, avail)
+    print(f"[backfill] {hour_to_dt(start):%Y-%m-%d %H}–{hour_to_dt(end):%Y-%m-%d %H} 時，"
+          f"{len(sids)} 站；需下載 {len(todo)} / {end - start + 1} 小時")
+    if not todo:
+        return
+
+    signal.signal(signal.SIGTERM, _stop)
+    deadline = time.monotonic() + args.max_minutes * 60 if args.max_minutes > 0 else None
+    try:
+        since = asyncio.run(run(todo, sids, store, ckpt, args.chunk_hours, args.rate, args.concurrency, deadline))
+    except KeyboardInterrupt:
+        print("[backfill] 中斷；進度已存，重跑即可續傳")
+        raise SystemExit(130)
+
+    if not since:
+        return
+    DerivedStore().update(store, since)
+    if args.no_export:
+        return
+    # 補進來的舊資料反映到多解析度檔（d1 涵蓋一年）；<sid>.json 帶預報，
+    # 留給下一次 ci_update（store 內容變了，manifest 雜湊自然不同）
+    for sid, h in since.items():
+        export_tiers(store, sid, h)
+    print(f"[backfill] 已重新輸出 {len(since)} 站的多解析度檔")
+
+if __name__ == "__main__":
+    main()
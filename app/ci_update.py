@@ -1,205 +1,320 @@
-import os, csv, json, requests, pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, sys, csv, json, math, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from ingest import ingest_hours
+from snapshot_cache import default_cache
+from forecast import forecasts_for
+from planner import plan_fetch, default_absent, LOOKBACK_HOURS, ABSENT_CACHE
+from station_store import StationStore, hour_to_dt, to_hour
+from tiers import export_tiers
+from derived import DerivedStore
+from payload import VERSION, columnar, from_rows, write_json
+from manifest import PublishManifest, content_hash
+import metrics
 
 TOKEN = os.environ["CWA_TOKEN"]               # 來自 GitHub Secrets
 DAYS  = int(os.getenv("EXPORT_DAYS", "30"))   # 匯出幾天到 JSON（預設30）
-MAX_HOURS_PER_RUN = int(os.getenv("HOURS_PER_RUN", "168"))  # 每次補抓多少小時
-
-session = requests.Session()
-session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
-
-# === F-D0047 城市 → 資料集代碼（先放已用到的縣市；如要再加就補這張表） ===
-FD0047_BY_CITY = {
-    "臺中市": "F-D0047-073",
-    "南投縣": "F-D0047-061",
-    "彰化縣": "F-D0047-053",
-}
-# ↑ 若某縣市抓不到，workflow log 會印警告，你只要補上該市的代碼即可。
-#   找法：到 CWA OpenData 搜「F-D0047 縣市名」，點進去看網址最後那段。
-
-def _fd_timeblocks_to_series(loc, name):
-    """把 F-D0047 的 weatherElement 陣列整理成 {ISO時刻: 值}"""
-    we = {e["elementName"]: e for e in loc["weatherElement"]}
-    out = {}
-    for elem in ("T", "RH"):
-        if elem not in we: 
-            continue
-        for tslot in we[elem]["time"]:
-            start = pd.to_datetime(tslot.get("startTime"))
-            end   = pd.to_datetime(tslot.get("endTime"))
-            val   = float(tslot["elementValue"][0]["value"])
-            # 以 1 小時步長，把 3 小時（或 6 小時）區間灌進去
-            t = start
-            while t < end:
-                out.setdefault(t, {})[elem] = val
-                t += pd.Timedelta(hours=1)
-    # 轉成 list（依時間排序）
-    rows = []
-    for t in sorted(out.keys()):
-        rows.append({"t": t, "temp": out[t].get("T"), "rh": out[t].get("RH")})
-    return rows
-
-def fetch_forecast(city, town):
-    ds = FD0047_BY_CITY.get(city)
-    if not ds:
-        print(f"[warn] 未設定 {city} 的 F-D0047 dataset id；跳過預報")
-        return {"24h": [], "7d": [], "30d": []}
-    url = f"https://opendata.cwa.gov.tw/api/v1/rest/datastore/{ds}"
-    params = {"Authorization": TOKEN, "format": "JSON", "elementName": "T,RH", "locationName": town}
-    r = session.get(url, params=params, timeout=20); r.raise_for_status()
-    j = r.json()
-    locs = j["records"]["locations"][0]["location"]
-    # 精準挑 town
-    loc = next((L for L in locs if L.get("locationName") == town), locs[0])
-
-    hourly = _fd_timeblocks_to_series(loc, town)            # 1 小時步長，長度約 7 天 * 24
-    now = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
-
-    # 取「未來 8 小時」
-    h8  = [r for r in hourly if r["t"] > now][:8]
-
-    # 聚合「未來 3 天 / 7 天」為每日代表值（用當日最大風險比較保守）
-    def day_bucket(rows, days):
-        end = now + pd.Timedelta(days=days)
-        cur = [r for r in rows if now < r["t"] <= end]
-        by_day = {}
-        for r in cur:
-            key = r["t"].date()
-            by_day.setdefault(key, []).append(r)
-        out = []
-        for d in sorted(by_day.keys()):
-            # 取溫濕度的「中位數」當代表值，避免極端值
-            tt = [x["temp"] for x in by_day[d] if x["temp"] is not None]
-            hh = [x["rh"]   for x in by_day[d] if x["rh"]   is not None]
-            out.append({"t": pd.Timestamp(d).tz_localize("Asia/Taipei"),
-                        "temp": (pd.Series(tt).median() if tt else None),
-                        "rh":   (pd.Series(hh).median() if hh else None)})
-        return out
-
-    d3  = day_bucket(hourly, 3)
-    d7  = day_bucket(hourly, 7)
-
-    # 統一成前端 JSON 需要的結構
-    to_json = lambda rows: [{"t": r["t"].isoformat(), "temp": r["temp"], "rh": r["rh"]} for r in rows]
-    return {"24h": to_json(h8), "7d": to_json(d3), "30d": to_json(d7)}
-
-def last_hours_list(hours=168):
-    end_ts = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
-    return list(pd.date_range(end=end_ts, periods=hours, freq="h"))
-
-def fetch_one_hour(dt, sid):
-    url = (f"https://opendata.cwa.gov.tw/historyapi/v1/getData/O-A0001-001/"
-           f"{dt:%Y/%m/%d/%H/00/00}?Authorization={TOKEN}&downloadType=WEB&format=JSON")
-    try:
-        r = session.get(url, timeout=10); r.raise_for_status()
-    except requests.HTTPError as e:
-        if getattr(e.response, "status_code", None) == 404:
-            return None
-        raise
-    try:
-        j = r.json()
-    except Exception:
-        import xmltodict
-        j = xmltodict.parse(r.text)
+MAX_HOURS_PER_RUN = int(os.getenv("HOURS_PER_RUN", "168"))  # 往回檢查多少小時的缺口
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))  # 合併、匯出各開幾條執行緒
+PIPELINE_QUEUE = int(os.getenv("PIPELINE_QUEUE", "32"))     # 階段之間佇列的長度上限
+DONE = object()                                             # 佇列結束記號
 
-    stations = (j.get("records") or {}).get("Station")
-    if stations is None:
-        stations = (j.get("cwaopendata") or {}).get("dataset", {}).get("Station", [])
-    if isinstance(stations, dict):
-        stations = [stations]
+FORECAST_STEP = {"24h": 3600, "7d": 86400, "30d": 86400}   # 預報三個視圖的間隔：逐時 / 每日
 
-    for s in stations:
-        if (s.get("StationId") or "").upper() == sid:
-            we = s.get("WeatherElement") or {}
-            now = we.get("Now") if isinstance(we.get("Now"), dict) else {}
-            return {
-                "DateTime": dt.isoformat(),
-                "Temperature": pd.to_numeric(we.get("AirTemperature"), errors="coerce"),
-                "RH": pd.to_numeric(we.get("RelativeHumidity"), errors="coerce"),
-                "Precip": pd.to_numeric((now or {}).get("Precipitation"), errors="coerce"),
-            }
-    return None
-
-def update_station(sid, city, town, name):
-    os.makedirs("data", exist_ok=True)
-    os.makedirs("docs/data", exist_ok=True)
+def forecast_placeholder():
+    """抓不到預報時，三個視圖的「未來時段佔位」（全為 null 的逐時區塊）"""
+    t0 = (to_hour(datetime.now(timezone.utc)) + 1) * 3600
+
+    def future_hours(n):
+        return columnar([t0 + i * 3600 for i in range(n)], {"temp": [None] * n, "rh": [None] * n}, 3600)
+
+    return {"24h": future_hours(8), "7d": future_hours(3*24), "30d": future_hours(7*24)}
+
+def encode_forecast(forecast):
+    """forecasts_for 的 [{t, temp, rh}] 三個視圖 → v2 區塊"""
+    return {k: from_rows(rows, FORECAST_STEP[k], ("temp", "rh")) for k, rows in forecast.items()}
+
+def merge_rows(store, sid, rows):
+    """ingest 的逐時紀錄寫進 data/store（定位覆寫）；回傳寫入的最早 epoch 小時，沒有就 None"""
+    rows = list(rows)
+    store.upsert(sid, rows)
+    metrics.count("rows_written", len(rows), station=sid)
+    return min((to_hour(r["DateTime"]) for r in rows), default=None)
 
-    # 抓近 MAX_HOURS_PER_RUN 小時並行補資料
-    rows = []
-    with ThreadPoolExecutor(max_workers=6) as ex:
-        futs = [ex.submit(fetch_one_hour, dt, sid) for dt in last_hours_list(MAX_HOURS_PER_RUN)]
-        for fut in as_completed(futs):
-            rec = fut.result()
-            if rec: rows.append(rec)
-
-    df_new = pd.DataFrame(rows)
-    cache_path = f"data/{sid}_hourly.csv"
-    if os.path.exists(cache_path):
-        old = pd.read_csv(cache_path, parse_dates=["DateTime"])
-        df_all = pd.concat([old, df_new], ignore_index=True)
-    else:
-        df_all = df_new.copy()
-
-    df_all["DateTime"] = pd.to_datetime(df_all["DateTime"])
-    df_all = df_all.drop_duplicates(subset=["DateTime"]).sort_values("DateTime")
-    df_all.to_csv(cache_path, index=False, encoding="utf-8-sig")
+def _block(hours, recs, step, fields):
+    """衍生指標 (hours, recs) → v2 區塊（NaN → null，旗標為整數位元）"""
+    num = lambda f, v: None if math.isnan(v) else int(v) if f == "flags" else round(v, 1)
+    return columnar([h * 3600 for h in hours.tolist()],
+                    {f: [num(f, v) for v in recs[f].tolist()] for f in fields}, step)
+
+def export_station(store, sid, city, town, name, since=None, forecast=None, manifest=None, derived=None):
+    """從 store 輸出 <sid>.json 與多解析度檔。
+    since：這次寫入 store 的最早小時（None = 沒有新資料）；
+    forecast：forecasts_for 整形好的本鄉鎮預報（None 時輸出未來時段佔位）；
+    manifest：PublishManifest，內容雜湊沒變就不重新輸出 <sid>.json；
+    derived：DerivedStore，衍生指標與 series 同一時間窗一起輸出。
+    回傳 (輸出路徑, 最新時刻, 這次是否有改寫)；store 裡還沒有這站的資料時不輸出，最新時刻為 None"""
+    os.makedirs("docs/data", exist_ok=True)
+    out_path = f"docs/data/{sid}.json"
 
     # 匯出 JSON（最近 DAYS 天）
-    end = df_all["DateTime"].max()
-    start = end - pd.Timedelta(days=DAYS)
-    df_out = df_all[df_all["DateTime"].between(start, end)].copy()
+    end = store.last_hour(sid)
+    if end is None:
+        for p in (out_path, out_path + ".gz", out_path + ".br"):     # 之前輸出過的空檔
+            if os.path.exists(p):
+                os.remove(p)
+        return out_path, None, False
+    start = end - DAYS * 24
+    hours, recs = store.read(sid, start, end)
+    (dh, drecs), (days, daily) = (derived or DerivedStore()).read(sid, start, end)
 
-    records = [{
-        "t": d.isoformat(),
-        "temp": None if pd.isna(t) else float(t),
-        "rh": None if pd.isna(h) else float(h),
-        "rain": 0.0 if pd.isna(p) else float(p),
-    } for d, t, h, p in zip(df_out["DateTime"], df_out["Temperature"], df_out["RH"], df_out["Precip"])]
+    # 多解析度檔（h1 / h3 / d1）：只重算這次寫入的最早小時之後的區間
+    export_tiers(store, sid, since)
 
-    # === 新增：三個視圖的「未來時段佔位」 ==============================
-    now = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
+    # 觀測、預報、站名都跟上次一樣 → 連序列化都省掉（佔位預報全是 null，不算資料）
+    last_ts = hour_to_dt(end)
+    digest = content_hash(VERSION, DAYS, city, town, name, hours, recs, dh, drecs, days, daily, forecast)
+    if manifest is not None and manifest.unchanged(sid, digest, out_path):
+        return out_path, last_ts, False
 
-    def future_hours(n):
-        return [(now + pd.Timedelta(hours=i)).isoformat() for i in range(1, n+1)]
-
-    forecast = {
-        "24h": [{"t": t, "temp": None, "rh": None} for t in future_hours(8)],
-        "7d":  [{"t": (now + pd.Timedelta(hours=i)).isoformat(), "temp": None, "rh": None}
-                for i in range(1, 3*24 + 1)],
-        "30d": [{"t": (now + pd.Timedelta(hours=i)).isoformat(), "temp": None, "rh": None}
-                for i in range(1, 7*24 + 1)],
-    }
-    # ================================================================
+    # v2：t0 + 固定間隔 + 平行陣列，缺的小時留 null
+    nan = math.isnan
+    series = columnar([h * 3600 for h in hours.tolist()], {
+        "temp": [None if nan(t) else t for t in recs["temp"].tolist()],
+        "rh":   [None if nan(rh) else rh for rh in recs["rh"].tolist()],
+        "rain": [0.0 if nan(p) else p for p in recs["precip"].tolist()],
+    }, 3600)
+
+    forecast = forecast_placeholder() if forecast is None else encode_forecast(forecast)
 
     payload = {
+        "v": VERSION,
         "station": sid,
         "city": city, "town": town, "name": name,
-        "generated_at": pd.Timestamp.utcnow().isoformat() + "Z",
-        "series": records,
+        "generated_at": datetime.now(timezone.utc).isoformat() + "Z",
+        "series": series,
+        # 露點 / 熱指數 / 累積雨量 / 旗標（逐時）與每日極值；旗標位元見 derived.py
+        "derived": _block(dh, drecs, 3600, ("dew", "hi", "rain1", "rain3", "rain24", "flags")),
+        "daily": _block(days, daily, 86400, ("tmin", "tmax", "rhmin", "himax", "rain", "rain1max", "flags")),
         "forecast": forecast,
     }
-    out_path = f"docs/data/{sid}.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False)
-    return out_path, df_out["DateTime"].max()
+    write_json(out_path, payload)
+    if manifest is not None:
+        manifest.set(sid, digest, latest=str(last_ts))
+    return out_path, last_ts, True
+
+def _forecasts(stations, fetch=True):
+    try:
+        with metrics.stage("forecast"):
+            return forecasts_for(stations, fetch=fetch)
+    except Exception as e:
+        print(f"[warn] 預報整批失敗（{type(e).__name__}: {e}）；全部輸出佔位")
+        return {}
+
+def run_pipeline(stations, need, recent, workers=PIPELINE_WORKERS, manifest=None, fetch=True):
+    """下載 → 合併 → 匯出 三段管線，各段之間用有界佇列串接。
+    回傳 ({sid: export_station 的結果}, {sid: 例外})
+    manifest：沿用呼叫端的 PublishManifest（常駐程式之後還要用同一份）；預設讀檔另開一份
+    fetch=False：預報也只用 .cache/forecast（python -m app export 完全不連網）
 
-def main():
+    - 下載：一條執行緒跑 ingest_hours，每完成一個小時就把 {sid: row} 送進各合併分片的佇列；
+      預報同時在另一條執行緒下載。
+    - 合併：測站依序分成 workers 片，每片一條執行緒，同一站固定由同一條寫入 store；
+      佇列暫時清空時才把累積的小時一次 upsert，不必每小時各開一次檔。
+    - 衍生指標：所有分片合併完，全部測站的新小時串在一起算一次（derived.py）。
+    - 匯出：workers 條執行緒；衍生指標算完，測站才進匯出佇列。
+    每個小時的快照同時帶有所有測站，所以匯出本來就得等下載完才開始；重疊的是下載、合併、
+    預報三者，以及各站匯出彼此之間。單站合併或匯出失敗只記錄下來，不影響其他測站。
+    """
+    n = max(1, min(workers, len(stations)))
+    shards = [stations[i::n] for i in range(n)]
+    merge_qs = [queue.Queue(PIPELINE_QUEUE) for _ in range(n)]
+    export_q = queue.Queue(PIPELINE_QUEUE)
+    results, errors, merged, lock = {}, {}, {}, threading.Lock()
+    manifest = PublishManifest() if manifest is None else manifest
+
+    def fail(sid, stage, e):
+        with lock:
+            errors.setdefault(sid, e)
+        print(f"[error] {sid} {stage}失敗：{type(e).__name__}: {e}")
+
+    def download():
+        sids, seen, checked, absent = [s["sid"] for s in stations], set(), [0], default_absent()
+
+        def on_hour(dt, found):
+            if absent is not None:
+                absent.record(dt, found, sids)
+            if found:
+                seen.update(found)
+                checked[0] += 1
+            for q in merge_qs:
+                q.put(found)
+
+        try:
+            with metrics.stage("fetch"):
+                ingest_hours(need, sids, refresh=recent, on_hour=on_hour)
+        except Exception as e:
+            print(f"[error] 觀測下載中斷（{type(e).__name__}: {e}）；用 store 現有資料匯出")
+        finally:
+            for q in merge_qs:
+                q.put(DONE)
+            if absent is not None:
+                absent.save()
+        # 看過的快照裡一次都沒有：多半是停報或 stations.csv 的代碼寫錯
+        for sid in (sids if checked[0] else []):
+            if sid.upper() not in seen:
+                metrics.count("stations_never_seen")
+                print(f"[warn] {sid} 不在這次讀到的 {checked[0]} 個快照裡（停報？代碼有誤？）"
+                      + (f"；已記入 {ABSENT_CACHE}，之後不再為它重讀這些小時" if absent is not None else ""))
+
+    def merge(shard, q):
+        store, since, pending = StationStore(), {}, {}
+        while True:
+            found = q.get()
+            if found is not DONE:
+                for s in shard:
+                    rec = found.get(s["sid"].upper())
+                    if rec is not None:
+                        pending.setdefault(s["sid"], []).append(rec)
+            if found is DONE or q.empty():
+                for sid, rows in pending.items():
+                    if sid in errors:
+                        continue
+                    try:
+                        with metrics.stage("merge"):
+                            h = merge_rows(store, sid, rows)
+                        since[sid] = min(h, since.get(sid, h))
+                    except Exception as e:
+                        fail(sid, "合併", e)
+                pending = {}
+            if found is DONE:
+                break
+        with lock:
+            merged.update(since)
+
+    def derive():
+        try:
+            with metrics.stage("derive"):
+                rows = DerivedStore().update(StationStore(), {s["sid"]: merged.get(s["sid"]) for s in stations
+                                                              if s["sid"] not in errors})
+            metrics.count("derived_rows", sum(rows.values()))
+        except Exception as e:
+            # 衍生指標失敗不擋匯出：沿用上次算好的部分
+            print(f"[warn] 衍生指標計算失敗（{type(e).__name__}: {e}）")
+
+    def export():
+        store, derived = StationStore(), DerivedStore()
+        while (item := export_q.get()) is not DONE:
+            s, since = item
+            if s["sid"] in errors:
+                continue
+            try:
+                fc = forecasts.result().get((s["city"], s["town"]))
+                with metrics.stage("export"):
+                    res = export_station(store, s["sid"], s["city"], s["town"], s["name"], since, fc, manifest, derived)
+                with lock:
+                    results[s["sid"]] = res
+            except Exception as e:
+                fail(s["sid"], "匯出", e)
+
+    with ThreadPoolExecutor(1) as pool:
+        forecasts = pool.submit(_forecasts, stations, fetch)
+        front = [threading.Thread(target=download)] + \
+                [threading.Thread(target=merge, args=(sh, q)) for sh, q in zip(shards, merge_qs)]
+        back = [threading.Thread(target=export) for _ in range(n)]
+        for t in front + back:
+            t.start()
+        for t in front:
+            t.join()
+        derive()
+        for s in stations:
+            export_q.put((s, merged.get(s["sid"])))
+        for _ in back:
+            export_q.put(DONE)
+        for t in back:
+            t.join()
+    manifest.flush()
+    cache = default_cache()
+    if cache is not None:
+        cache.close()          # 快照快取的淘汰與 index 寫回，一次 run 做一次
+    return results, errors
+
+def _old_index():
+    try:
+        with open("docs/data/index.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_index(entries, old=None):
+    """docs/data/index.json（前端下拉選單用）；內容和 old 相同就不改寫，回傳是否有寫入"""
+    index = {"stations": entries}
+    if old == index:
+        return False
+    with open("docs/data/index.json", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    return True
+
+def main(fetch=True):
+    """fetch=False：不下載觀測與預報，只用 store 與 .cache/forecast 現有資料重新輸出（python -m app export）"""
     # 讀站點名冊
     stations = []
     with open("app/stations.csv", newline="", encoding="utf-8") as f:
         for row in csv.DictReader(f):
             stations.append(row)
 
-    index = []
+    # 依本地快取算出缺口，只抓缺的小時（外加最近 LOOKBACK_HOURS 小時）
+    sids = [s["sid"] for s in stations]
+    with metrics.stage("plan"):
+        need, _ = plan_fetch(sids, MAX_HOURS_PER_RUN, LOOKBACK_HOURS) if fetch else ([], None)
+    metrics.set_info(stations=len(stations), hours_needed=len(need), hours_window=MAX_HOURS_PER_RUN,
+                     workers=PIPELINE_WORKERS)
+    print(f"[plan] 需下載 {len(need)} / {MAX_HOURS_PER_RUN} 小時")
+    # 每個小時的全台快照只下載一次（先查 .cache/snapshots），一次拆出所有測站；
+    # 最近 LOOKBACK_HOURS 小時略過快取，才抓得到 CWA 的事後更正。
+    # 預報：每個縣市資料集一次請求，同一發布時刻內沿用 .cache/forecast
+    recent = need[-LOOKBACK_HOURS:] if LOOKBACK_HOURS > 0 else []
+    results, errors = run_pipeline(stations, need, recent, fetch=fetch)
+
+    # 失敗的測站沿用上次 index.json 的條目，不讓單站問題把它從選單裡拿掉
+    old = _old_index()
+    prev = {e["sid"]: e for e in (old or {}).get("stations", [])}
+    index, changed = [], 0
     for s in stations:
         sid = s["sid"]; city=s["city"]; town=s["town"]; name=s["name"]
-        out_path, last_ts = update_station(sid, city, town, name)
-        print(f"[ok] {sid} → {out_path}（最新：{last_ts}）")
+        if sid not in results:
+            metrics.count("stations", result="failed")
+            print(f"[fail] {sid}：{type(errors.get(sid)).__name__}（{'保留上次的索引' if sid in prev else '暫不列入索引'}）")
+            if sid in prev:
+                index.append(prev[sid])
+            continue
+        out_path, last_ts, wrote = results[sid]
+        if last_ts is None:
+            # 一筆觀測都沒有的站（停報、代碼有誤）：前端畫不出來，不列進選單
+            metrics.count("stations", result="empty")
+            print(f"[skip] {sid} 還沒有任何觀測，暫不列入索引")
+            continue
+        changed += wrote
+        metrics.count("stations", result="written" if wrote else "unchanged")
+        print(f"[ok] {sid} → {out_path}（最新：{last_ts}）" if wrote else f"[skip] {sid} 內容未變動")
         index.append({"sid": sid, "city": city, "town": town, "name": name, "latest": str(last_ts)})
 
-    # 產生索引給前端下拉選單用
-    with open("docs/data/index.json", "w", encoding="utf-8") as f:
-        json.dump({"stations": index}, f, ensure_ascii=False)
+    # 產生索引給前端下拉選單用；內容相同就不改寫
+    wrote = write_index(index, old)
+    print(f"[publish] {changed} / {len(stations)} 站有變動{'；index.json 已更新' if wrote else ''}"
+          f"{f'；{len(errors)} 站失敗' if errors else ''}")
+
+def run(fetch=True):
+    """main 外加整體計時、.cache/metrics.json / Prometheus 報告；CWA_PROFILE=檔名 時順便跑 cProfile"""
+    try:
+        with metrics.stage("total"):
+            metrics.run_profiled(lambda: main(fetch))
+    finally:
+        # 這次 run 有沒有載入重量級套件（平常每小時的增量應該兩個都沒有）
+        metrics.set_info(heavy_modules=[m for m in ("pandas", "matplotlib") if m in sys.modules])
+        metrics.METRICS.write()
+        t = metrics.METRICS.report()["stages"]
+        print("[metrics] " + ", ".join(f"{k} {v['wall_s']}s" for k, v in t.items()))
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -0,0 +1,285 @@
+"""近即時常駐模式：輪詢即時資料集 O-A0001-001，新觀測一出來就寫進 data/store、只重新輸出有變的測站
+
+    python -m app daemon                          # 常駐；Ctrl-C / SIGTERM 結束
+    python -m app daemon --once                   # 補缺口 + 輪詢一次就結束
+    python -m app daemon --exec 'sh publish.sh'   # 每次有輸出就執行（例如 git commit + push）
+
+- 條件式請求：帶上次回應的 ETag / Last-Modified（If-None-Match / If-Modified-Since），
+  回 304、或內容雜湊與上次相同時連解析都省掉。
+- 輪詢間隔會自己調整：記住最近幾次新整點是在整點後幾秒出現的（取中位數），
+  平常一路睡到預計發布前 DAEMON_LEAD_S 秒，之後每 DAEMON_FAST_S 秒一次；
+  過了預計時刻還沒出現就逐漸拉長，最長 DAEMON_SLOW_S 秒。
+  同一整點只有部分測站出來時，DAEMON_LATE_GRACE_S 內持續快速輪詢等其他測站。
+- 只收整點觀測（ObsTime 分鐘為 0），與歷史快照同義；之後每小時排程的 LOOKBACK 重抓仍會蓋過更正。
+- 有變動的測站：upsert → 衍生指標 → export_station（PublishManifest 判斷是否真的要改寫）→ index.json；
+  預報沿用 .cache/forecast，同一發布時刻內不重抓。
+- 啟動時、以及發現漏掉整點時（例如斷線一陣子），先用 planner 找缺口，走每小時排程同一條管線補齊。
+- 學到的發布延遲與驗證標頭存在 .cache/daemon.json，重啟後沿用。
+"""
+import os, csv, json, math, time, signal, asyncio, hashlib, argparse, statistics, subprocess
+from collections import deque
+from datetime import datetime
+from fetcher import BASE_URL, FetchEngine
+from ingest import DATASET, iter_stations, station_record
+from planner import plan_fetch
+from station_store import StationStore, TZ, to_hour, hour_to_dt
+from derived import DerivedStore
+from manifest import PublishManifest
+from ci_update import MAX_HOURS_PER_RUN, merge_rows, export_station, run_pipeline, write_index, _old_index, _forecasts
+import metrics
+
+STATE_PATH = os.getenv("DAEMON_STATE", ".cache/daemon.json")
+FAST = float(os.getenv("DAEMON_FAST_S", "30"))              # 發布窗口內的輪詢間隔
+SLOW = float(os.getenv("DAEMON_SLOW_S", "600"))             # 間隔上限
+LEAD = float(os.getenv("DAEMON_LEAD_S", "60"))              # 預計發布前多久開始快速輪詢
+LATE_GRACE = float(os.getenv("DAEMON_LATE_GRACE_S", "1200"))  # 同一整點等晚到測站的時間
+GUESS = float(os.getenv("DAEMON_DELAY_GUESS_S", "300"))     # 還沒學到之前，假設整點後幾秒發布
+KEEP = 24                                                   # 記住最近幾次的發布延遲
+
+REALTIME_URL = f"{BASE_URL}/api/v1/rest/datastore/{DATASET}"
+
+class Schedule:
+    """依最近幾次新整點出現的時間，決定下次什麼時候輪詢（時間皆為 epoch 秒）"""
+
+    def __init__(self, delays=(), fast=FAST, slow=SLOW, lead=LEAD, grace=LATE_GRACE):
+        self.delays = deque(delays, maxlen=KEEP)
+        self.fast, self.slow, self.lead, self.grace = fast, slow, lead, grace
+
+    def expected(self, hour):
+        """epoch 小時 hour 的觀測預計出現的時刻"""
+        return hour * 3600 + (statistics.median(self.delays) if self.delays else GUESS)
+
+    def learn(self, hour, before, after):
+        """上一次輪詢（before）還沒有、這次（after）有：發布時刻落在兩者之間。
+        間隔短就取中點；間隔長（發布得比預期早）就取最早可能的時刻，下個整點會提早開始快速輪詢再校正"""
+        t = (before + after) / 2 if after - before <= 2 * self.fast else max(before, hour * 3600)
+        d = t - hour * 3600
+        if 0 <= d < 3600:
+            self.delays.append(d)
+
+    def wait(self, now, latest, complete):
+        """距下次輪詢的秒數；latest：已看到的最新整點，complete：追蹤中的測站是否都到了"""
+        if latest is None:
+            return self.fast
+        if not complete and now < self.expected(latest) + self.grace:
+            return self.fast                                  # 這個整點還有測站沒出來
+        due = self.expected(latest + 1)
+        if now < due - self.lead:
+            return min(self.slow, due - self.lead - now)
+        # 已過預計時刻：晚越久間隔越長（晚 2 分鐘仍是 FAST，晚 20 分鐘約 5 分鐘一次）
+        return min(self.slow, max(self.fast, (now - due) / 4))
+
+def _load_state(path=STATE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def _key(rec):
+    """比對用：NaN 換成 None（NaN != NaN，直接比會每次都當成有變）"""
+    return tuple(None if isinstance(v, float) and math.isnan(v) else v for v in rec.values())
+
+class Daemon:
+    def __init__(self, stations, state=None, on_change=None):
+        self.stations = stations
+        self.by_sid = {s["sid"].upper(): s for s in stations}
+        self.store, self.derived, self.manifest = StationStore(), DerivedStore(), PublishManifest()
+        self.state = state if state is not None else _load_state()
+        self.schedule = Schedule(self.state.get("delays", ()))
+        self.on_change = on_change
+        self.seen = {s["sid"]: self.store.last_hour(s["sid"]) for s in stations}   # 各站已有的最新整點
+        self.last = {}                                        # sid → 上次收到的紀錄（判斷數值更正）
+        self.prev_poll = None
+        # 輪詢共用一個下載引擎與事件迴圈：連線（keep-alive）跨輪詢沿用，不必每次重新連線
+        self.loop, self.engine = asyncio.new_event_loop(), FetchEngine(concurrency=1)
+
+    def close(self):
+        self.engine.close()
+        self.loop.close()
+
+    @property
+    def latest(self):
+        return max((h for h in self.seen.values() if h is not None), default=None)
+
+    @property
+    def complete(self):
+        latest = self.latest
+        return latest is not None and all(h == latest for h in self.seen.values())
+
+    def catch_up(self):
+        """store 最近 MAX_HOURS_PER_RUN 小時內的缺口用歷史快照補齊（與每小時排程同一條管線）"""
+        with metrics.stage("plan"):
+            need, _ = plan_fetch([s["sid"] for s in self.stations], MAX_HOURS_PER_RUN, 0)
+        if not need:
+            return 0
+        print(f"[daemon] 補缺口：{len(need)} 小時")
+        # 同一份 manifest：否則之後 publish 拿著舊雜湊，會重寫沒變的站、flush 時再把舊雜湊蓋回去
+        results, _ = run_pipeline(self.stations, need, [], manifest=self.manifest)
+        self._index({sid: res[1] for sid, res in results.items()})
+        self.seen = {s["sid"]: self.store.last_hour(s["sid"]) for s in self.stations}
+        self._changed(any(res[2] for res in results.values()))
+        return len(need)
+
+    def poll(self):
+        """條件式請求一次 → 有新內容時 {sid: (epoch 小時, 紀錄)}，沒有回 None"""
+        headers = {}
+        if self.state.get("etag"):
+            headers["If-None-Match"] = self.state["etag"]
+        if self.state.get("last_modified"):
+            headers["If-Modified-Since"] = self.state["last_modified"]
+        params = {"Authorization": os.getenv("CWA_TOKEN"), "format": "JSON",
+                  "StationId": ",".join(sorted(self.by_sid))}
+        with metrics.stage("poll"):
+            r = self.loop.run_until_complete(self.engine.get(REALTIME_URL, params=params, timeout=20, headers=headers))
+        if r.status_code == 304:
+            metrics.count("daemon_polls", result="not_modified")
+            return None
+        r.raise_for_status()
+        digest = hashlib.blake2b(r.content, digest_size=16).hexdigest()
+        same = digest == self.state.get("digest")
+        self.state.update(etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"), digest=digest)
+        if same:
+            metrics.count("daemon_polls", result="same")
+            return None
+        metrics.count("daemon_polls", result="changed")
+        found = {}
+        for s in iter_stations(r.json()):
+            sid = (s.get("StationId") or "").upper()
+            obs = (s.get("ObsTime") or {}).get("DateTime")
+            if sid not in self.by_sid or not obs:
+                continue
+            dt = datetime.fromisoformat(obs).astimezone(TZ)
+            if dt.minute or dt.second:                        # 整點之間的更新不收
+                continue
+            found[self.by_sid[sid]["sid"]] = (to_hour(dt), station_record(s, dt))
+        return found
+
+    def apply(self, found, now):
+        """新整點或數值更正的測站寫進 store → 衍生指標 → 輸出；回傳這次輸出的站數"""
+        latest, since, gap = self.latest, {}, False
+        for sid, (h, rec) in found.items():
+            if self.seen[sid] is not None and h < self.seen[sid]:
+                continue
+            if (h, _key(rec)) == self.last.get(sid):
+                continue
+            with metrics.stage("merge"):
+                merge_rows(self.store, sid, [rec])
+            gap |= self.seen[sid] is not None and h > self.seen[sid] + 1
+            self.seen[sid], self.last[sid], since[sid] = max(h, self.seen[sid] or h), (h, _key(rec)), h
+        if self.latest is not None and (latest is None or self.latest > latest) and self.prev_poll is not None:
+            self.schedule.learn(self.latest, self.prev_poll, now)
+        if not since:
+            return 0
+        if gap:
+            self.catch_up()          # 中間漏掉的整點走歷史快照；這次的即時資料下面照常輸出
+        return self.publish(since)
+
+    def publish(self, since):
+        with metrics.stage("derive"):
+            self.derived.update(self.store, since)
+        stations = [s for s in self.stations if s["sid"] in since]
+        forecasts = _forecasts(stations)
+        latest, wrote = {}, 0
+        for s in stations:
+            sid = s["sid"]
+            try:
+                with metrics.stage("export"):
+                    _, latest[sid], w = export_station(self.store, sid, s["city"], s["town"], s["name"], since[sid],
+                                                       forecasts.get((s["city"], s["town"])), self.manifest,
+                                                       self.derived)
+                wrote += w
+            except Exception as e:
+                print(f"[error] {sid} 匯出失敗：{type(e).__name__}: {e}")
+        self.manifest.flush()
+        self._index(latest)
+        lag = time.time() - max(since.values()) * 3600
+        metrics.observe("daemon_lag_s", lag)
+        print(f"[daemon] {hour_to_dt(max(since.values())):%m-%d %H}時：{len(since)} 站寫入、{wrote} 站重新輸出"
+              f"（整點後 {lag / 60:.1f} 分）", flush=True)
+        self._changed(wrote > 0)
+        return wrote
+
+    def _index(self, latest):
+        """index.json 只更新這次有輸出的測站的最新時刻，其他沿用"""
+        if not latest:
+            return
+        old = _old_index()
+        prev = {e["sid"]: e for e in (old or {}).get("stations", [])}
+        entries = []
+        for s in self.stations:
+            if latest.get(s["sid"]) is not None:
+                entries.append({"sid": s["sid"], "city": s["city"], "town": s["town"], "name": s["name"],
+                                "latest": str(latest[s["sid"]])})
+            elif s["sid"] in prev:
+                entries.append(prev[s["sid"]])
+        write_index(entries, old)
+
+    def _changed(self, wrote):
+        if not wrote:
+            return
+        metrics.METRICS.write()
+        if self.on_change:
+            rc = subprocess.run(self.on_change, shell=True).returncode
+            if rc:
+                print(f"[warn] --exec 結束碼 {rc}")
+
+    def step(self):
+        """輪詢一次並處理；回傳距下次輪詢的秒數"""
+        now = time.time()
+        try:
+            found = self.poll()
+            if found:
+                self.apply(found, now)
+        except Exception as e:
+            metrics.count("daemon_polls", result="error")
+            print(f"[warn] 輪詢失敗（{type(e).__name__}: {e}）")
+        self.prev_poll = now
+        self.state["delays"] = [round(d, 1) for d in self.schedule.delays]
+        _save_state(self.state)
+        return self.schedule.wait(time.time(), self.latest, self.complete)
+
+    def run(self, once=False):
+        while True:
+            wait = self.step()
+            if once:
+                return
+            print(f"[daemon] 下次輪詢：{wait:.0f} 秒後", flush=True)
+            time.sleep(wait)
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+def main():
+    ap = argparse.ArgumentParser(description="近即時常駐模式（輪詢 O-A0001-001 即時資料）")
+    ap.add_argument("--once", action="store_true", help="補缺口 + 輪詢一次就結束")
+    ap.add_argument("--no-catchup", action="store_true", help="啟動時不補 store 的缺口")
+    ap.add_argument("--exec", dest="on_change", default=os.getenv("DAEMON_EXEC"),
+                    help="每次有檔案改寫後執行的 shell 指令（例如提交並推送 docs/data）")
+    args = ap.parse_args()
+    with open("app/stations.csv", newline="", encoding="utf-8") as f:
+        stations = list(csv.DictReader(f))
+
+    daemon = Daemon(stations, on_change=args.on_change)
+    metrics.set_info(command="daemon", stations=len(stations))
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        if not args.no_catchup:
+            daemon.catch_up()
+        daemon.run(args.once)
+    except KeyboardInterrupt:
+        print("[daemon] 結束")
+    finally:
+        _save_state(daemon.state)
+        daemon.close()
+        metrics.METRICS.write()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""衍生指標：露點、熱指數、1/3/24 小時累積雨量、每日極值與門檻旗標。
+
+結果另存在 .cache/derived/hourly、.cache/derived/daily（與 data/store 同樣的分月定長檔；
+每日統計放在當日台北 0 時那一格），每次只算 store 裡新寫入（或還沒算過）的小時，
+所有測站串成一條陣列一次算完。放在 .cache 而不是 data/：隨時可以從 store 重算，
+不必每小時進 git（快取冷掉時第一次 run 會整段重算）。
+"""
+import os, numpy as np
+from station_store import StationStore, to_hour
+from tiers import bucket_start, hourly_rain
+
+DERIVED_DIR = os.getenv("DERIVED_DIR", ".cache/derived")
+
+HOURLY = np.dtype([("dew", "<f8"), ("hi", "<f8"), ("rain1", "<f8"), ("rain3", "<f8"), ("rain24", "<f8"),
+                   ("flags", "<f8"), ("flag", "u1")])
+DAILY = np.dtype([("tmin", "<f8"), ("tmax", "<f8"), ("rhmin", "<f8"), ("himax", "<f8"), ("rain", "<f8"),
+                  ("rain1max", "<f8"), ("flags", "<f8"), ("flag", "u1")])
+
+# 門檻旗標（位元）：熱指數達「極度注意」、CWA 大雨 / 豪雨 / 低溫特報標準
+HEAT, HEAVY_RAIN, TORRENTIAL, COLD = 1, 2, 4, 8
+HEAT_INDEX_C = float(os.getenv("DERIVED_HEAT_INDEX_C", "32"))
+COLD_C = float(os.getenv("DERIVED_COLD_C", "10"))
+HEAVY_1H, HEAVY_24H = 40.0, 80.0
+TORRENTIAL_3H, TORRENTIAL_24H = 100.0, 200.0
+
+LEAD = 24        # 往前多讀的小時：24 小時累積雨量與當日統計都需要
+SCHEMA = 2       # 算法有變就加一：各站已算好的值整段重算（2：溫濕度特殊代碼視為缺值）
+
+def dew_point(temp, rh):
+    """Magnus 公式（°C）"""
+    t, rh = np.asarray(temp, dtype=float), np.asarray(rh, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = np.log(rh / 100) + 17.625 * t / (243.04 + t)
+        return np.where(rh > 0, 243.04 * g / (17.625 - g), np.nan)
+
+def heat_index(temp, rh):
+    """NWS 熱指數（Rothfusz 迴歸，低溫時用簡式），輸入輸出皆為 °C"""
+    f, rh = np.asarray(temp, dtype=float) * 9 / 5 + 32, np.asarray(rh, dtype=float)
+    simple = 0.5 * (f + 61 + (f - 68) * 1.2 + rh * 0.094)
+    full = (-42.379 + 2.04901523 * f + 10.14333127 * rh - 0.22475541 * f * rh - 6.83783e-3 * f * f
+            - 5.481717e-2 * rh * rh + 1.22874e-3 * f * f * rh + 8.5282e-4 * f * rh * rh - 1.99e-6 * f * f * rh * rh)
+    with np.errstate(invalid="ignore"):
+        full -= np.where((rh < 13) & (f >= 80) & (f <= 112), (13 - rh) / 4 * np.sqrt(np.maximum(0, 17 - abs(f - 95)) / 17), 0)
+        full += np.where((rh > 85) & (f >= 80) & (f <= 87), (rh - 85) / 10 * (87 - f) / 5, 0)
+        out = np.where((simple + f) / 2 >= 80, full, simple)
+    return (out - 32) * 5 / 9
+
+def _rolling(x, seg0, w):
+    """每格往前 w 小時（含本格、不跨測站）的加總；視窗內全是 NaN 時為 NaN"""
+    ok = ~np.isnan(x)
+    cs = np.r_[0.0, np.cumsum(np.where(ok, x, 0.0))]
+    cn = np.r_[0, np.cumsum(ok)]
+    i = np.arange(len(x)) + 1
+    j = np.maximum(i - w, seg0)
+    return np.where(cn[i] - cn[j] > 0, cs[i] - cs[j], np.nan)
+
+def compute(segments):
+    """segments：[(hours, recs), ...]，每段是一站「連續且逐時不缺格」的原始資料 → 平面陣列的衍生值
+
+    回傳 (段號, 小時, 逐時衍生值 dict, 每日統計 dict)；每日統計以 (段號, 當日 0 時) 為鍵。
+    """
+    n = np.array([len(h) for h, _ in segments], dtype=np.int64)
+    seg = np.repeat(np.arange(len(segments)), n)
+    seg0 = np.repeat(np.r_[0, np.cumsum(n)[:-1]], n)
+    hours = np.concatenate([h for h, _ in segments])
+    temp = np.concatenate([r["temp"] for _, r in segments])
+    rh = np.concatenate([r["rh"] for _, r in segments])
+    rain = np.concatenate([r["rain"] for _, r in segments])
+
+    hi = heat_index(temp, rh)
+    hourly = {"dew": dew_point(temp, rh), "hi": hi,
+              "rain1": rain, "rain3": _rolling(rain, seg0, 3), "rain24": _rolling(rain, seg0, 24)}
+    flags = np.zeros(len(hours))
+    with np.errstate(invalid="ignore"):
+        flags += np.where(hi >= HEAT_INDEX_C, HEAT, 0)
+        flags += np.where((rain >= HEAVY_1H) | (hourly["rain24"] >= HEAVY_24H), HEAVY_RAIN, 0)
+        flags += np.where((hourly["rain3"] >= TORRENTIAL_3H) | (hourly["rain24"] >= TORRENTIAL_24H), TORRENTIAL, 0)
+        flags += np.where(temp <= COLD_C, COLD, 0)
+    hourly["flags"] = flags
+
+    # 每日：資料依 (段, 時) 排好，換段或換日的地方就是一組的開頭
+    day = bucket_start(hours, 24)
+    first = np.flatnonzero(np.r_[True, (seg[1:] != seg[:-1]) | (day[1:] != day[:-1])])
+    ok = ~np.isnan(rain)
+    with np.errstate(invalid="ignore"):
+        daily = {"tmin": np.fmin.reduceat(temp, first), "tmax": np.fmax.reduceat(temp, first),
+                 "rhmin": np.fmin.reduceat(rh, first), "himax": np.fmax.reduceat(hi, first),
+                 "rain": np.where(np.add.reduceat(ok.astype(int), first) > 0,
+                                  np.add.reduceat(np.where(ok, rain, 0.0), first), np.nan),
+                 "rain1max": np.fmax.reduceat(rain, first),
+                 "flags": np.bitwise_or.reduceat(flags.astype(np.int64), first).astype(float)}
+    return seg, hours, hourly, (seg[first], day[first], daily)
+
+class DerivedStore:
+    """衍生值的讀寫；hourly / daily 各是一個 StationStore"""
+
+    def __init__(self, root=DERIVED_DIR):
+        self.hourly = StationStore(os.path.join(root, "hourly"), HOURLY, legacy_csv=None, sentinels=False)
+        self.daily = StationStore(os.path.join(root, "daily"), DAILY, legacy_csv=None, sentinels=False)
+
+    def _schema_path(self, sid):
+        return os.path.join(self.hourly._dir(sid), "_schema")
+
+    def _schema(self, sid):
+        try:
+            with open(self._schema_path(sid), encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _start(self, store, sid, since):
+        """這站要從哪個小時開始重算；None = 已是最新"""
+        last, done = store.last_hour(sid), self.hourly.last_hour(sid)
+        if last is None:
+            return None
+        if done is None or self._schema(sid) != SCHEMA:
+            months = store.months(sid)
+            return to_hour(f"{months[0][0]:04d}-{months[0][1]:02d}-01T00:00:00")
+        start = since if since is not None else None
+        if done < last:
+            start = done + 1 if start is None else min(start, done + 1)
+        return start
+
+    def update(self, store, since_by_sid):
+        """since_by_sid：{sid: 這次寫入 store 的最早小時 or None} → {sid: 重算的小時數}"""
+        segments, owners = [], []
+        for sid, since in since_by_sid.items():
+            start = self._start(store, sid, since)
+            if start is None:
+                continue
+            end = store.last_hour(sid)
+            hours, recs = store.read(sid, start - LEAD, end)
+            if not len(hours):
+                continue
+            # 攤成逐時不缺格的陣列；雨量先用實際有資料的小時換算，缺格留 NaN
+            grid = np.arange(hours[0], end + 1)
+            dense = np.zeros(len(grid), dtype=[("temp", "<f8"), ("rh", "<f8"), ("rain", "<f8")])
+            for f in dense.dtype.names:
+                dense[f] = np.nan
+            slot = hours - grid[0]
+            dense["temp"][slot], dense["rh"][slot] = recs["temp"], recs["rh"]
+            dense["rain"][slot] = hourly_rain(hours, recs["precip"])
+            have = np.zeros(len(grid), dtype=bool); have[slot] = True
+            segments.append((grid, dense)); owners.append((sid, start, have))
+        if not segments:
+            return {}
+
+        seg, hours, hourly, (dseg, days, daily) = compute(segments)
+        have = np.concatenate([h for _, _, h in owners])
+        done = {}
+        for k, (sid, start, _) in enumerate(owners):
+            # 只寫回 store 有資料的新小時；當日統計則覆寫 start 所在那天起的每一天
+            keep = (seg == k) & (hours >= start) & have
+            self.hourly.upsert_arrays(sid, hours[keep], **{f: v[keep] for f, v in hourly.items()})
+            dkeep = (dseg == k) & (days >= bucket_start(start, 24))
+            self.daily.upsert_arrays(sid, days[dkeep], **{f: v[dkeep] for f, v in daily.items()})
+            done[sid] = int(keep.sum())
+            os.makedirs(self.hourly._dir(sid), exist_ok=True)
+            with open(self._schema_path(sid), "w", encoding="utf-8") as f:
+                f.write(str(SCHEMA))
+        return done
+
+    def read(self, sid, start=None, end=None):
+        """(逐時 hours, recs), (每日 0 時 hours, recs)，皆為 [start, end] 內"""
+        day0 = None if start is None else int(bucket_start(start, 24))
+        return self.hourly.read(sid, start, end), self.daily.read(sid, day0, end)
@@ -1,5 +1,7 @@
-import os, json, pandas as pd
+import os, math, pandas as pd
 from dotenv import load_dotenv
+from station_store import StationStore, to_hour
+from payload import VERSION, columnar, write_json
 
 load_dotenv()
 STATION_ID = os.getenv("STATION_ID")
@@ -9,54 +11,48 @@ if not STATION_ID:
 # 參數：輸出幾天資料（預設 30 天）
 DAYS = int(os.getenv("EXPORT_DAYS", "30"))
 
-cache_path = f"data/{STATION_ID}_hourly.csv"
+store = StationStore()
 out_dir = "docs/data"; os.makedirs(out_dir, exist_ok=True)
 out_path = f"{out_dir}/{STATION_ID}.json"
 
-if not os.path.exists(cache_path):
-    raise FileNotFoundError(f"找不到快取檔：{cache_path}（先跑 fetch_7d.py 累積一下）")
+if store.last_hour(STATION_ID) is None:
+    raise FileNotFoundError(f"data/store 裡沒有 {STATION_ID} 的資料（先跑 fetch_7d.py 累積一下）")
 
-df = pd.read_csv(cache_path, parse_dates=["DateTime"]).sort_values("DateTime")
-end = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
-start = end - pd.Timedelta(days=DAYS)
-df = df[df["DateTime"].between(start, end)].copy()
+# 直接用 memmap 讀最近 DAYS 天的區間，不必載入整份歷史
+end = to_hour(pd.Timestamp.now(tz="Asia/Taipei").floor("h"))
+hours, recs = store.read(STATION_ID, end - DAYS * 24, end)
 
-records = []
-for _, row in df.iterrows():
-    records.append({
-        "t": pd.to_datetime(row["DateTime"]).isoformat(),
-        "temp": None if pd.isna(row["Temperature"]) else float(row["Temperature"]),
-        "rh":   None if pd.isna(row["RH"])         else float(row["RH"]),
-        "rain": 0.0  if pd.isna(row["Precip"])     else float(row["Precip"]),
-    })
+nan = math.isnan
+series = columnar([h * 3600 for h in hours.tolist()], {
+    "temp": [None if nan(t) else t for t in recs["temp"].tolist()],
+    "rh":   [None if nan(rh) else rh for rh in recs["rh"].tolist()],
+    "rain": [0.0  if nan(p) else p for p in recs["precip"].tolist()],
+}, 3600)
 
 # === 這段是新增：建立三個視圖要用的「未來時段佔位」 ======================
 now = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
 
+t1 = int(now.timestamp()) + 3600
+
 def future_hours(n):
-    # 產生未來 n 小時的 ISO 時戳（含時區）
-    return [(now + pd.Timedelta(hours=i)).isoformat() for i in range(1, n+1)]
+    # 未來 n 小時、全為 null 的 v2 區塊（只用來撐出時間軸）
+    return columnar([t1 + i * 3600 for i in range(n)], {"temp": [None] * n, "rh": [None] * n}, 3600)
 
 forecast = {
-    # 24h 視圖右側要 +8 小時
-    "24h": [{"t": t, "temp": None, "rh": None} for t in future_hours(8)],
-    # 7d 視圖右側要 +3 天（= 72 小時）
-    "7d":  [{"t": (now + pd.Timedelta(hours=i)).isoformat(), "temp": None, "rh": None}
-            for i in range(1, 3*24 + 1)],
-    # 30d 視圖右側要 +7 天（= 168 小時）
-    "30d": [{"t": (now + pd.Timedelta(hours=i)).isoformat(), "temp": None, "rh": None}
-            for i in range(1, 7*24 + 1)],
+    "24h": future_hours(8),        # 24h 視圖右側要 +8 小時
+    "7d":  future_hours(3*24),     # 7d 視圖右側要 +3 天（= 72 小時）
+    "30d": future_hours(7*24),     # 30d 視圖右側要 +7 天（= 168 小時）
 }
 # =====================================================================
 
 payload = {
+    "v": VERSION,
     "station": STATION_ID,
     "generated_at": pd.Timestamp.utcnow().isoformat() + "Z",
-    "series": records,
+    "series": series,
     "forecast": forecast,
 }
 
-with open(out_path, "w", encoding="utf-8") as f:
-    json.dump(payload, f, ensure_ascii=False)
+write_json(out_path, payload)
 
-print(f"已輸出 {len(records)} 筆 → {out_path}")
+print(f"已輸出 {len(hours)} 筆 → {out_path}")
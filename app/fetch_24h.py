@@ -1,7 +1,9 @@
-import os, requests
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
+from ingest import ingest_hours
+from availability import AvailabilityIndex
 
 load_dotenv()
 TOKEN = os.getenv("CWA_TOKEN")
@@ -9,59 +11,12 @@ STATION_ID = os.getenv("STATION_ID")
 if not TOKEN or not STATION_ID:
     raise RuntimeError("請在 .env 設定 CWA_TOKEN 與 STATION_ID")
 
-# 1) 取得「最近很多小時」的索引清單
-meta_url = "https://opendata.cwa.gov.tw/historyapi/v1/getMetadata/O-A0001-001"
-meta = requests.get(meta_url, params={"Authorization": TOKEN}, timeout=30).json()
-times = meta["dataset"]["resources"]["resource"]["data"]["time"]  # 清單，內含 DateTime / ProductURL
-times = sorted(times, key=lambda t: t["DateTime"])
+# 1) 最近 24 個「已發布」的小時：來自 getMetadata 的可用清單（.cache/availability.json，與 ci_update 共用）
+hours = AvailabilityIndex().last(24)
 
-# 2) 只取最近 24 小時
-last_24 = times[-24:]
-
-rows = []
-for item in last_24:
-    when = item["DateTime"]
-    print(".", end="", flush=True)
-    # ProductURL 內已帶 ?Authorization=...，改成自己帶參數避免把 token 印出到日誌
-    url = item["ProductURL"]
-    if "format=" not in url:
-        url = url + "&downloadType=WEB&format=JSON"
-
-    try:
-        r = requests.get(url, timeout=30, headers={"Accept": "application/json"})
-        r.raise_for_status()
-    except requests.HTTPError as e:
-        # 該小時檔尚未生成 → 404 就跳過
-        if getattr(e.response, "status_code", None) == 404:
-            continue
-        raise
-
-    # 優先解析 JSON，不行就用 XML 後援
-    try:
-        j = r.json()
-    except Exception:
-        import xmltodict
-        j = xmltodict.parse(r.text)
-
-    # 兼容不同包裝：優先走 records.Station，否則嘗試 cwaopendata.dataset.Station
-    stations = (j.get("records") or {}).get("Station")
-    if stations is None:
-        stations = (j.get("cwaopendata") or {}).get("dataset", {}).get("Station", [])
-    if isinstance(stations, dict):  # 有時候只回一筆會是 dict
-        stations = [stations]
-
-    # 找到你的測站
-    for s in stations:
-        if s.get("StationId") == STATION_ID:
-            we = s.get("WeatherElement", {}) or {}
-            now = we.get("Now") if isinstance(we.get("Now"), dict) else {}
-            rows.append({
-                "DateTime": when,
-                "Temperature": pd.to_numeric(we.get("AirTemperature"), errors="coerce"),
-                "RH": pd.to_numeric(we.get("RelativeHumidity"), errors="coerce"),
-                "Precip": pd.to_numeric((now or {}).get("Precipitation"), errors="coerce"),
-            })
-            break
+# 同一小時的快照經 .cache/snapshots 快取（與 fetch_7d / ci_update 共用）；
+# 重試用盡的小時會被略過
+rows = ingest_hours(hours, [STATION_ID])[STATION_ID.upper()]
 
 df = pd.DataFrame(rows).sort_values("DateTime")
 
@@ -1,7 +1,8 @@
-import os, requests, pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os, pandas as pd
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
+from ingest import ingest_hours
+from station_store import StationStore, hour_to_dt
 
 load_dotenv()
 TOKEN = os.getenv("CWA_TOKEN")
@@ -9,81 +10,25 @@ STATION_ID = os.getenv("STATION_ID")
 if not TOKEN or not STATION_ID:
     raise RuntimeError("請在 .env 設定 CWA_TOKEN 與 STATION_ID")
 
-# 建立可重用連線，開 gzip 減少流量
-session = requests.Session()
-session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
-
 # 1) 直接組「過去 168 小時」清單（不依賴 metadata）
 end_ts = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
 last_hours = list(pd.date_range(end=end_ts, periods=168, freq="h"))
 
-def fetch_one(dt):
-    """下載單一小時資料，回傳該測站的三欄位；不存在就回 None。"""
-    url = (
-    f"https://opendata.cwa.gov.tw/historyapi/v1/getData/O-A0001-001/"
-    f"{dt:%Y/%m/%d/%H/00/00}?Authorization={TOKEN}&downloadType=WEB&format=JSON"
-    )
-    try:
-        resp = session.get(url, timeout=10)
-        resp.raise_for_status()
-    except requests.HTTPError as e:
-        # 該小時尚未產出 → 404 就跳過
-        if getattr(e.response, "status_code", None) == 404:
-            return None
-        raise
-
-    # 優先 JSON，不行就 XML
-    try:
-        j = resp.json()
-    except Exception:
-        import xmltodict
-        j = xmltodict.parse(resp.text)
-
-    stations = (j.get("records") or {}).get("Station")
-    if stations is None:
-        stations = (j.get("cwaopendata") or {}).get("dataset", {}).get("Station", [])
-    if isinstance(stations, dict):
-        stations = [stations]
-
-    for s in stations:
-        if s.get("StationId") == STATION_ID:
-            we = s.get("WeatherElement", {}) or {}
-            now = we.get("Now") if isinstance(we.get("Now"), dict) else {}
-            return {
-                "DateTime": dt.isoformat(),
-                "Temperature": pd.to_numeric(we.get("AirTemperature"), errors="coerce"),
-                "RH": pd.to_numeric(we.get("RelativeHumidity"), errors="coerce"),
-                "Precip": pd.to_numeric((now or {}).get("Precipitation"), errors="coerce"),
-            }
-    return None
-
-# 3) 輕量並行下載，加速
-rows = []
-with ThreadPoolExecutor(max_workers=6) as ex:
-    futs = [ex.submit(fetch_one, t) for t in last_hours]
-    for fut in as_completed(futs):
-        r = fut.result()
-        if r:
-            rows.append(r)
-
-df = pd.DataFrame(rows)
-# === 本地快取累積（新增） ===
-os.makedirs("data", exist_ok=True)
-cache_path = f"data/{STATION_ID}_hourly.csv"
-if os.path.exists(cache_path):
-    old = pd.read_csv(cache_path, parse_dates=["DateTime"])
-    all_df = pd.concat([old, df], ignore_index=True)
-else:
-    all_df = df.copy()
+# 2) 非同步下載（限速、失敗重試；經 .cache/snapshots 快取，與 ci_update 共用）
+rows = ingest_hours(last_hours, [STATION_ID])[STATION_ID.upper()]
 
-all_df["DateTime"] = pd.to_datetime(all_df["DateTime"])
-all_df = all_df.drop_duplicates(subset=["DateTime"]).sort_values("DateTime")
-all_df.to_csv(cache_path, index=False, encoding="utf-8-sig")
+# === 本地快取累積：寫進 data/store，再用 memmap 讀回最近 7 天 ===
+store = StationStore()
+store.upsert(STATION_ID, rows)
 
 # 清整 & 時間窗鎖定到「最新往回 7 天」
-end = all_df["DateTime"].max()
-start = end - pd.Timedelta(days=7)
-df7 = all_df[all_df["DateTime"].between(start, end)].copy()
+end = store.last_hour(STATION_ID)
+hours, recs = store.read(STATION_ID, end - 7 * 24 if end is not None else None, end)
+df7 = pd.DataFrame({
+    "DateTime": [hour_to_dt(h) for h in hours.tolist()],
+    "Temperature": recs["temp"], "RH": recs["rh"], "Precip": recs["precip"],
+})
+df7["DateTime"] = pd.to_datetime(df7["DateTime"])
 
 print("7天筆數：", len(df7))
 print(df7.tail(5).to_string(index=False))
@@ -0,0 +1,157 @@
+import os, time, random, asyncio, requests
+from collections import Counter
+from requests.adapters import HTTPAdapter
+import metrics
+
+# 指向本地替身伺服器即可離線測試（例如 http://127.0.0.1:8765）
+BASE_URL = os.getenv("CWA_BASE_URL", "https://opendata.cwa.gov.tw").rstrip("/")
+
+CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "6"))   # 同時在途的請求數
+RATE        = float(os.getenv("FETCH_RATE", "5"))        # 平均每秒幾個請求（<=0 不限速）
+BURST       = int(os.getenv("FETCH_BURST", "10"))        # 令牌桶容量（允許的瞬間爆量）
+RETRIES     = int(os.getenv("FETCH_RETRIES", "4"))       # 429 / 5xx / 連線錯誤的重試次數
+BACKOFF     = float(os.getenv("FETCH_BACKOFF", "0.5"))   # 退避基準秒數（指數成長 + 隨機抖動）
+TIMEOUT     = float(os.getenv("FETCH_TIMEOUT", "10"))
+
+class TokenBucket:
+    """令牌桶限速：平均 rate 個/秒，最多累積 burst 個"""
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate, self.capacity = rate, max(1, burst)
+        self.tokens = float(self.capacity)
+        self.t = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class FetchStats:
+    """每個請求的耗時 / 狀態碼 / 位元組數（不存 URL，避免把 token 印到日誌）"""
+
+    def __init__(self):
+        self.latencies, self.status, self.bytes, self.retries = [], Counter(), 0, 0
+
+    def record(self, status, seconds, nbytes):
+        code = status if status is not None else "error"
+        self.latencies.append(seconds)
+        self.status[code] += 1
+        self.bytes += nbytes
+        # 同時累計到整個 run 的量測（metrics.json）
+        metrics.count("http_requests", status=code)
+        metrics.count("http_bytes", nbytes)
+        metrics.observe("http_seconds", seconds)
+
+    def retry(self):
+        self.retries += 1
+        metrics.count("http_retries")
+
+    def summary(self):
+        lat = sorted(self.latencies)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+        return {"requests": len(lat), "status": dict(self.status), "retries": self.retries,
+                "bytes": self.bytes, "p50_s": round(pct(0.5), 3), "p95_s": round(pct(0.95), 3),
+                "max_s": round(lat[-1], 3) if lat else 0.0}
+
+    def report(self, label):
+        s = self.summary()
+        codes = ", ".join(f"{k}×{v}" for k, v in sorted(s["status"].items(), key=str))
+        print(f"[fetch] {label}: {s['requests']} req ({codes}), retries {s['retries']}, "
+              f"p50 {s['p50_s']}s p95 {s['p95_s']}s, {s['bytes'] / 1e6:.1f} MB")
+
+class FetchEngine:
+    """asyncio 下載引擎：併發上限 + 令牌桶限速 + 指數退避重試
+
+    實際 HTTP 仍走共用的 requests.Session（在 worker thread 執行），
+    404 視為正常結果直接回傳，由呼叫端判斷；重試用盡才拋出例外。
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, rate=RATE, burst=BURST,
+                 retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+        self.sem = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.stats = FetchStats()
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=concurrency))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+
+    def _delay(self, attempt, r):
+        ra = r.headers.get("Retry-After") if r is not None else None
+        if ra and ra.isdigit():
+            return float(ra)
+        # full jitter：0 ~ backoff * 2^attempt
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def _request(self, url, params, timeout, sink, headers=None):
+        """一次完整請求（含重試）；sink 不為 None 時以串流模式下載，
+        200 的內容交給 sink(chunks) 在 worker thread 內消化，回傳 (r, sink 的結果)。
+        headers 會疊在 session 的預設標頭上（例如條件式請求的 If-None-Match）"""
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            r = err = result = None
+            async with self.sem:
+                t0 = time.perf_counter()
+                nbytes = [0]
+                def call():
+                    resp = self.session.get(url, params=params, headers=headers, timeout=timeout or self.timeout,
+                                            stream=sink is not None)
+                    if sink is None:
+                        nbytes[0] = len(resp.content)
+                        return resp, None
+                    with resp:
+                        if resp.status_code != 200:
+                            return resp, None
+                        def chunks():
+                            for c in resp.iter_content(65536):
+                                nbytes[0] += len(c)
+                                yield c
+                        return resp, sink(chunks())
+                try:
+                    r, result = await asyncio.to_thread(call)
+                except requests.RequestException as e:
+                    err = e
+                self.stats.record(r.status_code if r is not None else None,
+                                  time.perf_counter() - t0, nbytes[0])
+            if r is not None and (r.status_code < 400 or r.status_code == 404):
+                return r, result
+            retryable = r is None or r.status_code == 429 or r.status_code >= 500
+            if not retryable or attempt == self.retries:
+                if r is not None:
+                    r.raise_for_status()
+                raise err
+            self.stats.retry()
+            await asyncio.sleep(self._delay(attempt, r))
+
+    async def get(self, url, params=None, timeout=None, headers=None):
+        """一般請求；304 / 404 也直接回傳，由呼叫端判斷"""
+        r, _ = await self._request(url, params, timeout, None, headers)
+        return r
+
+    async def stream(self, url, sink, params=None, timeout=None):
+        """串流下載：回傳 (status_code, sink(chunks) 的結果)；非 200 時結果為 None"""
+        r, result = await self._request(url, params, timeout, sink)
+        return r.status_code, result
+
+    def close(self):
+        self.session.close()
+
+def get_sync(url, params=None, timeout=None, headers=None):
+    """同步程式碼用：單次請求也享有重試與退避；404 之外的錯誤會拋出"""
+    async def run():
+        engine = FetchEngine(concurrency=1)
+        try:
+            return await engine.get(url, params=params, timeout=timeout, headers=headers)
+        finally:
+            engine.close()
+    return asyncio.run(run())
@@ -0,0 +1,204 @@
+import os, json, math, warnings, numpy as np
+from datetime import datetime, timedelta
+from fetcher import BASE_URL, get_sync
+from station_store import TZ, to_hour, hour_to_dt
+from tiers import bucket_start
+import metrics
+
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", ".cache/forecast")
+# 鄉鎮預報的發布時刻（台北時間）與發布後多久才視為已上線
+ISSUE_HOURS = sorted(int(h) for h in os.getenv("FORECAST_ISSUE_HOURS", "5,11,17,23").split(","))
+PUBLISH_DELAY_MIN = int(os.getenv("FORECAST_PUBLISH_DELAY_MIN", "30"))
+
+# === F-D0047 城市 → 資料集代碼（先放已用到的縣市；如要再加就補這張表） ===
+FD0047_BY_CITY = {
+    "臺中市": "F-D0047-073",
+    "南投縣": "F-D0047-061",
+    "彰化縣": "F-D0047-053",
+}
+# ↑ 若某縣市抓不到，workflow log 會印警告，你只要補上該市的代碼即可。
+#   找法：到 CWA OpenData 搜「F-D0047 縣市名」，點進去看網址最後那段。
+
+ELEMENTS = {"T": "temp", "RH": "rh"}
+EMPTY = {"24h": [], "7d": [], "30d": []}
+
+def _taipei(ts):
+    """ISO 字串 → 台北時間 datetime；沒帶時區的（舊版 "2026-10-18 06:00:00"）本來就是台北當地時間"""
+    t = datetime.fromisoformat(ts)
+    return t.replace(tzinfo=TZ) if t.tzinfo is None else t.astimezone(TZ)
+
+def _expand_locations(locs):
+    """多個鄉鎮的 3h/6h 區間一次展開成逐時值（整批 repeat，不逐小時迴圈）
+
+    回傳 {town: [[ISO 時刻, temp, rh], ...]}（依時間排序，即 .cache/forecast 存的格式）。
+    每個區間展開成 start, start+1h, ... < end；同一鄉鎮、同一要素的區間重疊時後面的覆蓋前面的。
+    只有真的下載到新預報時才會走到這裡，pandas 也才在這時載入。
+    """
+    import pandas as pd
+    town, elem, starts, ends, vals = [], [], [], [], []
+    for loc in locs:
+        name = loc.get("locationName")
+        we = {e["elementName"]: e for e in loc["weatherElement"]}
+        for key, col in ELEMENTS.items():
+            for s in (we.get(key) or {}).get("time", []):
+                town.append(name); elem.append(col)
+                starts.append(s.get("startTime")); ends.append(s.get("endTime"))
+                vals.append(float(s["elementValue"][0]["value"]))
+    if not town:
+        return {}
+
+    # 同一份回應可能混著有/沒有時區的字串，逐一正規化成台北時間再交給 pandas
+    start = pd.DatetimeIndex([_taipei(t) for t in starts]).tz_convert("Asia/Taipei")
+    end   = pd.DatetimeIndex([_taipei(t) for t in ends]).tz_convert("Asia/Taipei")
+    n = np.ceil((end - start) / pd.Timedelta(hours=1)).to_numpy().clip(min=0).astype(np.int64)
+    owner = np.repeat(np.arange(len(n)), n)
+    step  = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    long = pd.DataFrame({
+        "town": np.asarray(town, dtype=object)[owner],
+        "elem": np.asarray(elem, dtype=object)[owner],
+        "t": start[owner] + pd.to_timedelta(step, unit="h"),
+        "v": np.asarray(vals)[owner],
+    }).drop_duplicates(["town", "elem", "t"], keep="last")
+    wide = long.pivot(index=["town", "t"], columns="elem", values="v")
+    wide = wide.reindex(columns=list(ELEMENTS.values())).sort_index()
+    clean = lambda v: None if math.isnan(v) else float(v)
+    hourly = {}
+    for (name, t), tt, hh in zip(wide.index, wide["temp"].tolist(), wide["rh"].tolist()):
+        hourly.setdefault(name, []).append([t.isoformat(), clean(tt), clean(hh)])
+    return hourly
+
+def _median(v):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)      # 整天都是 NaN → NaN（轉成 null）
+        m = np.nanmedian(v)
+    return None if math.isnan(m) else float(m)
+
+def shape_forecasts(hourly, now):
+    """多鄉鎮逐時預報 {town: [[ISO, temp, rh], ...]} → {town: 三個視圖}：
+    未來 8 小時、未來 3 天 / 7 天每日中位數（略過缺值）
+
+    只用 numpy：每小時的排程大多命中 .cache/forecast，整條路徑都不必載入 pandas。
+    """
+    nowh = to_hour(now)
+    out = {}
+    for name, pts in hourly.items():
+        out[name] = views = dict(EMPTY)
+        if not pts:
+            continue
+        h = np.fromiter((to_hour(p[0]) for p in pts), dtype=np.int64, count=len(pts))
+        v = np.array([[np.nan if x is None else x for x in p[1:]] for p in pts], dtype=float)
+        fut = np.flatnonzero(h > nowh)
+        views["24h"] = [{"t": pts[i][0], "temp": pts[i][1], "rh": pts[i][2]} for i in fut[:8]]
+        # 聚合「未來 N 天」為每日代表值：取溫濕度的「中位數」，避免極端值
+        day = bucket_start(h, 24)
+        for key, days in (("7d", 3), ("30d", 7)):
+            m = fut[h[fut] <= nowh + days * 24]
+            rows = []
+            for d in np.unique(day[m]).tolist():
+                sel = m[day[m] == d]
+                rows.append({"t": hour_to_dt(d).isoformat(), "temp": _median(v[sel, 0]), "rh": _median(v[sel, 1])})
+            views[key] = rows
+    return out
+
+def issue_slot(now):
+    """now 當下最近一次「應已發布」的預報時刻：到了這個時刻才值得去問有沒有新預報"""
+    t = now - timedelta(minutes=PUBLISH_DELAY_MIN)
+    day = t.replace(hour=0, minute=0, second=0, microsecond=0)
+    cands = [day + timedelta(hours=h) for h in ISSUE_HOURS]
+    past = [c for c in cands if c <= t]
+    return max(past) if past else day - timedelta(days=1) + timedelta(hours=ISSUE_HOURS[-1])
+
+def issued_at(locs):
+    """回應本身的發布版本：所有鄉鎮、要素裡最早的 startTime（新一版預報的第一個時段會往後移）
+
+    一律正規化成台北時間再比，新舊兩種時間格式混在一起也能比、版本字串也前後一致。
+    """
+    starts = [_taipei(t["startTime"]) for L in locs for e in L.get("weatherElement", [])
+              for t in e.get("time", []) if t.get("startTime")]
+    return min(starts).isoformat() if starts else None
+
+def _cache_path(ds):
+    return os.path.join(FORECAST_CACHE_DIR, f"{ds}.json")
+
+def _load_cache(ds):
+    try:
+        with open(_cache_path(ds), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_cache(ds, data):
+    os.makedirs(FORECAST_CACHE_DIR, exist_ok=True)
+    tmp = _cache_path(ds) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, _cache_path(ds))
+
+def fetch_city(ds, towns):
+    """一個縣市資料集只發一次請求，一次拿回所有需要的鄉鎮"""
+    url = f"{BASE_URL}/api/v1/rest/datastore/{ds}"
+    params = {"Authorization": os.getenv("CWA_TOKEN"), "format": "JSON", "elementName": "T,RH",
+              "locationName": ",".join(sorted(towns))}
+    r = get_sync(url, params=params, timeout=20); r.raise_for_status()
+    locs = r.json()["records"]["locations"][0]["location"]
+    return [L for L in locs if L.get("locationName") in towns]
+
+def city_hourly(ds, towns, now, fetch=True):
+    """{town: [[ISO時刻, temp, rh], ...]}：同一發布時刻內直接用 .cache/forecast 的結果
+
+    快取記著兩個時刻：slot（照表「應已發布」的時刻，issue_slot）與 issued（回應裡實際的版本，issued_at）。
+    同一個 slot 內、且當時抓到的版本比前一份新、涵蓋所有鄉鎮，才算命中；
+    CWA 晚發布時抓回來的還是舊版，就不算數，下次 run 再問，直到版本前進為止。下載失敗時退回舊快取。
+    fetch=False：只看快取（不管新舊），絕不發請求；沒有快取就回空 dict。
+    """
+    slot = issue_slot(now).isoformat()
+    cached = _load_cache(ds)
+    if not fetch:
+        metrics.count("forecast_cache", result="offline")
+        return cached["hourly"] if cached else {}
+    covered = cached and set(towns) <= set(cached.get("towns", []))
+    if covered and cached.get("slot") == slot and cached.get("advanced"):
+        metrics.count("forecast_cache", result="hit")
+        return cached["hourly"]
+    try:
+        locs = fetch_city(ds, towns)
+    except Exception as e:
+        print(f"[warn] {ds} 預報下載失敗（{type(e).__name__}）；{'沿用舊快取' if cached else '跳過預報'}")
+        metrics.count("forecast_cache", result="stale" if cached else "error")
+        return cached["hourly"] if cached else {}
+    issued = issued_at(locs)
+    # 同一個 slot 內已確認前進過，就不會因為再抓一次而退回「未前進」
+    advanced = not cached or issued != cached.get("issued") or (cached.get("slot") == slot and cached.get("advanced"))
+    if not advanced and covered:
+        # 內容還是舊版：不必重新展開（也就不必載入 pandas），下次 run 再問
+        metrics.count("forecast_cache", result="not_advanced")
+        return cached["hourly"]
+    metrics.count("forecast_cache", result="miss")
+    hourly = _expand_locations(locs)
+    _save_cache(ds, {"slot": slot, "issued": issued, "advanced": bool(advanced), "fetched": now.isoformat(),
+                     "towns": sorted(towns), "hourly": hourly})
+    return hourly
+
+def forecasts_for(stations, now=None, fetch=True):
+    """所有測站的預報 → {(city, town): 三個視圖}
+
+    依 FD0047_BY_CITY 把鄉鎮歸到縣市資料集，每個資料集一次請求（有快取就免），
+    再把全部鄉鎮一起丟進 shape_forecasts 整形。fetch=False 只用 .cache/forecast，不發請求。
+    """
+    now = now if now is not None else datetime.now(TZ).replace(minute=0, second=0, microsecond=0)
+    by_ds = {}
+    for s in stations:
+        ds = FD0047_BY_CITY.get(s["city"])
+        if not ds:
+            print(f"[warn] 未設定 {s['city']} 的 F-D0047 dataset id；跳過預報")
+            continue
+        by_ds.setdefault(ds, {})[s["town"]] = s["city"]
+
+    hourly, owner = {}, {}
+    for ds, towns in by_ds.items():
+        for town, pts in city_hourly(ds, set(towns), now, fetch).items():
+            if town not in towns:
+                continue
+            key = f"{ds}/{town}"          # 不同縣市可能有同名鄉鎮（例如「東區」）
+            owner[key], hourly[key] = (towns[town], town), pts
+    return {owner[k]: v for k, v in shape_forecasts(hourly, now).items()}
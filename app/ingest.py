@@ -0,0 +1,127 @@
+import os, math, time, asyncio
+import metrics
+from fetcher import BASE_URL, FetchEngine
+from station_store import SENTINEL_MAX
+from snapshot_cache import default_cache
+from stream_extract import StationExtractor, extract_stream
+
+DATASET = "O-A0001-001"
+HISTORY_URL = f"{BASE_URL}/historyapi/v1/getData/{DATASET}"
+
+def _num(v):
+    """字串/數字 → float；轉不了、或是特殊代碼（-99 等）就 NaN"""
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return math.nan
+    return math.nan if v <= SENTINEL_MAX else v
+
+def iter_stations(j):
+    """兼容兩種包裝：records.Station 或 cwaopendata.dataset.Station"""
+    stations = (j.get("records") or {}).get("Station")
+    if stations is None:
+        stations = (j.get("cwaopendata") or {}).get("dataset", {}).get("Station", [])
+    if isinstance(stations, dict):  # 只回一筆時會是 dict
+        stations = [stations]
+    return stations or []
+
+def station_record(s, dt):
+    """單一 Station 節點 → 快取 CSV 的一列"""
+    we = s.get("WeatherElement") or {}
+    now = we.get("Now") if isinstance(we.get("Now"), dict) else {}
+    return {
+        "DateTime": dt.isoformat(),
+        "Temperature": _num(we.get("AirTemperature")),
+        "RH": _num(we.get("RelativeHumidity")),
+        "Precip": _num((now or {}).get("Precipitation")),
+    }
+
+def _records(found, dt):
+    return {sid: station_record(s, dt) for sid, s in found.items()}
+
+def _file_chunks(f, size=65536):
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+async def _one_hour(engine, dt, sids, refresh=False):
+    """單一小時的全台 O-A0001-001 快照 → {sid: row}；該小時不存在回空 dict
+
+    先查本地快取（串流解壓 + 串流解析，湊齊測站就停）；沒有才下載。
+    下載時一邊壓縮寫入快取、一邊餵給解析器，不會把整包載入記憶體。
+    refresh=True 會略過快取重新下載（給 LOOKBACK 的事後更正用），並覆寫快取。
+    """
+    cache = default_cache()
+    f = cache.open(DATASET, dt) if cache and not refresh else None
+    if f is not None:
+        metrics.count("snapshot_cache", result="hit")
+        t0 = time.perf_counter()
+        with f:
+            found = extract_stream(_file_chunks(f), sids)
+        metrics.observe("parse_seconds", time.perf_counter() - t0, source="cache")
+        return _records(found, dt)
+    metrics.count("snapshot_cache", result="refresh" if cache and refresh else "miss")
+
+    def sink(chunks):
+        ex, spent = StationExtractor(sids), [0.0]
+
+        def feed(chunk):
+            # 只計解析本身，不含等網路的時間
+            t0 = time.perf_counter()
+            done = ex.feed(chunk)
+            spent[0] += time.perf_counter() - t0
+            return done
+
+        if cache:
+            cache.put_stream(DATASET, dt, chunks, feed)
+        else:
+            for chunk in chunks:
+                if feed(chunk):
+                    break
+        found = ex.close()
+        metrics.observe("parse_seconds", spent[0], source="network")
+        return _records(found, dt)
+
+    token = os.getenv("CWA_TOKEN")
+    url = f"{HISTORY_URL}/{dt:%Y/%m/%d/%H/00/00}?Authorization={token}&downloadType=WEB&format=JSON"
+    status, rows = await engine.stream(url, sink)
+    return rows if status == 200 else {}
+
+async def ingest_hours_async(hours, sids, refresh=(), engine=None, report=True, on_hour=None):
+    refresh = set(refresh)
+    own = engine is None
+    engine = engine or FetchEngine()
+    out = {s.upper(): [] for s in sids}
+
+    async def one(dt):
+        res = await _one_hour(engine, dt, sids, dt in refresh)
+        if on_hour is not None:
+            on_hour(dt, res)
+        return res
+
+    try:
+        results = await asyncio.gather(*(one(dt) for dt in hours), return_exceptions=True)
+    finally:
+        if own:
+            engine.close()
+    for dt, res in zip(hours, results):
+        if isinstance(res, Exception):
+            # 單一小時重試用盡 → 跳過，不拖垮整個 run；下次 planner 會再補這個缺口
+            print(f"[warn] {dt:%Y-%m-%d %H:00} 下載失敗：{type(res).__name__}")
+            continue
+        for sid, rec in res.items():
+            out[sid].append(rec)
+    if report and hours:
+        engine.stats.report(f"{len(hours)} 小時快照")
+    return out
+
+def ingest_hours(hours, sids, refresh=(), report=True, on_hour=None):
+    """每個小時只抓一次，分送到各站；回傳 {sid: [row, ...]}
+
+    refresh：這些小時略過快取、一定重新下載。
+    on_hour(dt, {sid: row})：每下載完一個小時就呼叫一次（在事件迴圈裡同步執行，
+    所以它若塞進有界佇列而阻塞，下載也會跟著暫停——下游來不及消化時的背壓）。
+    """
+    return asyncio.run(ingest_hours_async(hours, sids, refresh, report=report, on_hour=on_hour))
@@ -1,21 +1,14 @@
-import os, requests
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
-TOKEN = os.getenv("CWA_TOKEN")
-URL = "https://opendata.cwa.gov.tw/api/v1/rest/datastore/O-A0001-001"
+from station_registry import default_registry
 
-params = {"Authorization": TOKEN}
-r = requests.get(URL, params=params, timeout=30)
-r.raise_for_status()
-stations = r.json().get("records", {}).get("Station", [])
-
-city, town = "臺中市", "大里區"  # 先固定，之後再做成參數
-found = [(s.get("StationId"), s.get("StationName"))
-         for s in stations
-         if (s.get("GeoInfo") or {}).get("CountyName")==city
-         and (s.get("GeoInfo") or {}).get("TownName")==town]
+# python app/list_stations.py [縣市] [鄉鎮]；名冊快取在 .cache/stations.json（見 station_registry.py）
+city = sys.argv[1] if len(sys.argv) > 1 else "臺中市"
+town = sys.argv[2] if len(sys.argv) > 2 else "大里區"
+found = default_registry().in_town(city, town)
 
 print(f"{city} {town} 測站列表：")
-for sid, name in found:
-    print(f"- {name} / StationID={sid}")
+for s in found:
+    print(f"- {s['name']} / StationID={s['sid']}")
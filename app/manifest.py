@@ -0,0 +1,56 @@
+import os, json, hashlib, threading
+import numpy as np
+
+MANIFEST_PATH = os.getenv("PUBLISH_MANIFEST", "docs/data/_manifest.json")
+
+def content_hash(*parts):
+    """資料本身的雜湊：numpy 陣列直接吃原始位元組，其他東西用排序過 key 的 JSON"""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        if isinstance(p, np.ndarray):
+            h.update(np.ascontiguousarray(p).tobytes())
+        else:
+            h.update(json.dumps(p, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class PublishManifest:
+    """docs/data/_manifest.json：每站上次發布內容的雜湊
+
+    雜湊只涵蓋真正的資料（觀測序列、預報、站名等），不含 generated_at，
+    所以資料沒變的測站可以整個略過輸出，workflow 也就不會每小時提交一樣的東西。
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("stations", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def unchanged(self, sid, digest, *paths):
+        """雜湊與上次相同、且輸出檔都還在"""
+        ent = self.entries.get(sid)
+        return bool(ent) and ent.get("hash") == digest and all(os.path.exists(p) for p in paths)
+
+    def set(self, sid, digest, **info):
+        ent = {"hash": digest, **info}
+        with self._lock:
+            if self.entries.get(sid) != ent:
+                self.entries[sid] = ent
+                self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"stations": self.entries}, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            return True
@@ -0,0 +1,128 @@
+import os, sys, json, time, threading, contextlib
+from collections import defaultdict, deque
+
+METRICS_PATH = os.getenv("METRICS_PATH", ".cache/metrics.json")   # 空字串 = 不輸出；不放 docs/data，免得每次 run 都有東西可提交
+PROM_PATH = os.getenv("METRICS_PROM_PATH", "")    # 給 node_exporter textfile collector 的 .prom 檔
+PROFILE = os.getenv("CWA_PROFILE", "")            # 設成檔名就用 cProfile 包住整個 run 並存檔
+MAX_SAMPLES = int(os.getenv("METRICS_MAX_SAMPLES", "10000"))   # 每個分佈只留最近幾筆算百分位（常駐程式記憶體不再一直長）
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+class RunMetrics:
+    """一次 run 的量測：階段耗時、計數器、分佈（例如每份快照的解析時間）
+
+    全部執行緒共用一個實例（見 METRICS），只在寫報告時才整理成 JSON / Prometheus 格式。
+    分佈的筆數與總和一直累計；p50 / p95 / max 只看最近 MAX_SAMPLES 筆。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}                    # name → {"wall": 首次開始到最後結束, "busy": 各段加總, "n"}
+        self.counters = defaultdict(float)  # (name, labels) → 值
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))   # (name, labels) → 最近的值
+        self.totals = defaultdict(lambda: [0, 0.0])                      # (name, labels) → [筆數, 總和]
+        self.info = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """計時一個階段；同名階段可在多個執行緒同時進行（wall 取整體跨度，busy 取加總）"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            t1 = time.perf_counter()
+            with self._lock:
+                st = self.stages.setdefault(name, {"first": t0, "last": t1, "busy": 0.0, "n": 0})
+                st["first"], st["last"] = min(st["first"], t0), max(st["last"], t1)
+                st["busy"] += t1 - t0; st["n"] += 1
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            k = _key(name, labels)
+            self.samples[k].append(value)
+            tot = self.totals[k]
+            tot[0] += 1; tot[1] += value
+
+    def set_info(self, **kv):
+        with self._lock:
+            self.info.update(kv)
+
+    def report(self):
+        """整理成可存成 JSON 的 dict"""
+        with self._lock:
+            def flat(items, fn):
+                out = {}
+                for (name, labels), v in sorted(items, key=lambda kv: (kv[0][0], kv[0][1])):
+                    tag = ",".join(f"{k}={v}" for k, v in labels)
+                    out.setdefault(name, {})[tag or "total"] = fn(v)
+                return out
+
+            def dist(item):
+                vals, (n, total) = item
+                v = sorted(vals)
+                pct = lambda q: v[min(len(v) - 1, int(q * len(v)))]
+                return {"n": n, "sum": round(total, 4), "p50": round(pct(0.5), 4),
+                        "p95": round(pct(0.95), 4), "max": round(v[-1], 4)}
+
+            stages = {k: {"wall_s": round(s["last"] - s["first"], 3), "busy_s": round(s["busy"], 3), "n": s["n"]}
+                      for k, s in self.stages.items()}
+            rep = {"started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                   "info": dict(self.info), "stages": stages,
+                   "counters": flat(self.counters.items(), lambda v: round(v, 4)),
+                   "distributions": flat(((k, (v, self.totals[k])) for k, v in self.samples.items()), dist)}
+        hits = rep["counters"].get("snapshot_cache", {})
+        looked = hits.get("result=hit", 0) + hits.get("result=miss", 0)
+        rep["snapshot_cache_hit_ratio"] = round(hits.get("result=hit", 0) / looked, 3) if looked else None
+        return rep
+
+    def prometheus(self):
+        """Prometheus textfile 格式（cwa_ 前綴）"""
+        esc = lambda s: str(s).replace("\\", "\\\\").replace('"', '\\"')
+        lbl = lambda labels: "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}" if labels else ""
+        lines = []
+        with self._lock:
+            for name, s in sorted(self.stages.items()):
+                lines.append(f'cwa_stage_seconds{{stage="{esc(name)}"}} {s["last"] - s["first"]:.4f}')
+            for (name, labels), v in sorted(self.counters.items()):
+                lines.append(f"cwa_{name}_total{lbl(labels)} {v:g}")
+            for (name, labels), (n, total) in sorted(self.totals.items()):
+                lines.append(f"cwa_{name}_sum{lbl(labels)} {total:.4f}")
+                lines.append(f"cwa_{name}_count{lbl(labels)} {n}")
+            lines.append(f"cwa_run_started_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=METRICS_PATH, prom_path=PROM_PATH):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        if prom_path:
+            tmp = prom_path + ".tmp"      # textfile collector 要求原子替換
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, prom_path)
+
+METRICS = RunMetrics()
+stage, count, observe, set_info = METRICS.stage, METRICS.count, METRICS.observe, METRICS.set_info
+
+def run_profiled(fn, path=PROFILE):
+    """CWA_PROFILE=檔名 時以 cProfile 執行 fn，存成 pstats 檔並印出累計耗時前 25 名
+
+    cProfile 只看得到呼叫它的執行緒；管線各階段的時間請看 metrics.json 的 stages。
+    """
+    if not path:
+        return fn()
+    import cProfile, pstats
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn)
+    finally:
+        prof.dump_stats(path)
+        pstats.Stats(prof, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+        print(f"[profile] → {path}", file=sys.stderr)
@@ -0,0 +1,68 @@
+import os, gzip, json
+from datetime import datetime, timedelta, timezone
+
+try:                      # requirements.txt 有 brotli；本地沒裝就只寫 .gz（啟動時提醒一次）
+    import brotli
+except ImportError:
+    brotli = None
+    print("[warn] 沒有安裝 brotli：這次只輸出 .json / .json.gz，不寫 .br（pip install brotli）")
+
+VERSION = 2
+TZ = timezone(timedelta(hours=8))
+
+# v2 的時間序列區塊：
+#   {"t0": 第一格的 ISO 時刻, "step": 間隔秒數, "<欄位>": [...], ...}
+# 第 i 格的時刻 = t0 + i*step；缺資料的格子填 null，不再每筆重複 key 與時間字串。
+
+def _epoch(t):
+    return int(datetime.fromisoformat(t).timestamp())
+
+def columnar(times, cols, step):
+    """times：遞增的 epoch 秒；cols：欄位名 → 與 times 等長的值 → v2 區塊"""
+    if not times:
+        return {"t0": None, "step": step, **{k: [] for k in cols}}
+    t0 = times[0]
+    n = (times[-1] - t0) // step + 1
+    out = {"t0": datetime.fromtimestamp(t0, TZ).isoformat(), "step": step}
+    slots = [(t - t0) // step for t in times]
+    for k, vals in cols.items():
+        arr = [None] * n
+        for i, v in zip(slots, vals):
+            arr[i] = v
+        out[k] = arr
+    return out
+
+def from_rows(rows, step, fields):
+    """[{t, 欄位...}] → v2 區塊；所有欄位都是 None 的列視同缺資料"""
+    rows = [r for r in rows if any(r.get(f) is not None for f in fields)]
+    return columnar([_epoch(r["t"]) for r in rows], {f: [r.get(f) for r in rows] for f in fields}, step)
+
+def to_rows(block):
+    """v2 區塊 → [{t, 欄位...}]（跳過全是 null 的格子），給增量更新讀回舊檔用"""
+    fields = [k for k in block if k not in ("t0", "step")]
+    if not block.get("t0"):
+        return []
+    t0, step = _epoch(block["t0"]), block["step"]
+    rows = []
+    for i, vals in enumerate(zip(*(block[f] for f in fields))):
+        if any(v is not None for v in vals):
+            t = datetime.fromtimestamp(t0 + i * step, TZ).isoformat()
+            rows.append({"t": t, **dict(zip(fields, vals))})
+    return rows
+
+def write_json(path, payload):
+    """寫 <path> 以及預先壓縮好的 <path>.gz / <path>.br（給 gzip_static / brotli_static 之類直接送）
+
+    緊湊分隔符；gzip 的 mtime 固定為 0，內容沒變時壓縮檔也逐位元相同，不會在 git 產生假變動。
+    """
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+    elif os.path.exists(path + ".br"):
+        os.remove(path + ".br")       # 避免留下與 .json 不同步的舊 .br
+    return len(data)
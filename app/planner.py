@@ -0,0 +1,102 @@
+import os, json, math, numpy as np
+from datetime import datetime
+from station_store import StationStore, TZ, to_hour, hour_to_dt
+from availability import default_index, hour_ranges
+
+LOOKBACK_HOURS = int(os.getenv("LOOKBACK_HOURS", "3"))  # 最近幾小時一律重抓（CWA 事後更正）
+ABSENT_CACHE = os.getenv("ABSENT_CACHE", ".cache/absent.json")   # 空字串 = 不記，缺的小時每次都重抓
+
+def last_hours_list(hours=168):
+    """到目前整點為止的最近 hours 個小時（台北時間 datetime，舊 → 新）"""
+    end = to_hour(datetime.now(TZ))
+    return [hour_to_dt(h) for h in range(end - hours + 1, end + 1)]
+
+def have_hours(store, sid, start, end):
+    """讀 data/store 的 [start, end] 區間，回傳已有完整溫濕度的 epoch 小時集合"""
+    hours, recs = store.read(sid, start, end)
+    ok = ~(np.isnan(recs["temp"]) | np.isnan(recs["rh"]))
+    return set(hours[ok].tolist())
+
+class AbsentIndex:
+    """各站「快照已經看過、但裡面沒有這站完整溫濕度」的小時（.cache/absent.json，負向快取）
+
+    停報、撤站、代碼打錯或儀器只回特殊代碼的測站，在 store 裡每個小時都是缺口；
+    不記下來的話，每次 run 都要把整個視窗的快照重讀重解析一遍（Actions 快取冷掉時還得重新下載）。
+    空快照（404、沒發布）不算看過。
+    """
+
+    def __init__(self, path=ABSENT_CACHE):
+        self.path, self.hours = path, {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                j = json.load(f)
+            self.hours = {sid: {h for a, b in r for h in range(a, b + 1)}
+                          for sid, r in j.get("ranges", {}).items()}
+        except (OSError, ValueError):
+            pass
+
+    def record(self, dt, found, sids):
+        """ingest 的 on_hour：found = {SID: row}（大寫）"""
+        if not found:
+            return
+        h = to_hour(dt)
+        for sid in sids:
+            row = found.get(sid.upper())
+            if row and not (math.isnan(row["Temperature"]) or math.isnan(row["RH"])):
+                self.hours.get(sid, set()).discard(h)
+            else:
+                self.hours.setdefault(sid, set()).add(h)
+
+    def prune(self, start):
+        """丟掉比 start（epoch 小時）還舊的紀錄；已經在視窗外，不會再規劃到"""
+        self.hours = {sid: kept for sid, hs in self.hours.items() if (kept := {h for h in hs if h >= start})}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ranges": {sid: hour_ranges(sorted(hs)) for sid, hs in self.hours.items()}}, f)
+        os.replace(tmp, self.path)
+
+_absent = None
+
+def default_absent():
+    """全程式共用一個實例（常駐程式的 planner 和管線用同一份）；ABSENT_CACHE 設成空字串時回 None"""
+    global _absent
+    if _absent is None and ABSENT_CACHE:
+        _absent = AbsentIndex()
+    return _absent
+
+def missing_hours(store, sid, wanted, lookback=LOOKBACK_HOURS, absent=()):
+    """本站在 wanted 時段中缺的（或值為 NaN 的）小時，外加最後 lookback 小時
+
+    absent：快照裡確定沒有本站的 epoch 小時，不算缺口（最後 lookback 小時照樣重抓）
+    """
+    if not wanted:
+        return []
+    have = have_hours(store, sid, to_hour(wanted[0]), to_hour(wanted[-1]))
+    recent = set(wanted[-lookback:]) if lookback > 0 else set()
+    return [dt for dt in wanted
+            if dt in recent or ((h := to_hour(dt)) not in have and h not in absent)]
+
+def plan_fetch(sids, hours=168, lookback=LOOKBACK_HOURS, store=None, avail=None, absent=None):
+    """合併各站缺口 → 這次真正要下載的小時（排序），以及每站各自的缺口
+
+    avail：AvailabilityIndex（預設共用的那份）；只考慮 getMetadata 列出、確定已發布的小時，
+    尚未生成或永久缺檔的小時不再每次用 404 去試。
+    absent：AbsentIndex（預設共用的那份）；看過確定沒有該站的小時不再重讀。
+    """
+    store = store or StationStore()
+    wanted = last_hours_list(hours)
+    avail = avail or default_index()
+    if avail is not None:
+        wanted = avail.filter(wanted)
+    absent = absent or default_absent()
+    if absent is not None and wanted:
+        absent.prune(to_hour(wanted[0]))
+    skip = absent.hours if absent is not None else {}
+    per_sid = {sid: missing_hours(store, sid, wanted, lookback, skip.get(sid, ())) for sid in sids}
+    need = sorted({dt for gaps in per_sid.values() for dt in gaps})
+    return need, per_sid
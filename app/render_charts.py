@@ -0,0 +1,142 @@
+"""批次輸出各測站的 24h / 7d 圖（docs/charts/<sid>_24h.png、<sid>_7d.png）
+
+    python app/render_charts.py                 # app/stations.csv 全部測站
+    python app/render_charts.py C0F9N0 --force  # 指定測站、不管有沒有變動都重畫
+
+- 資料直接從 data/store 讀（不下載）；時間窗內容的雜湊記在 docs/charts/_manifest.json，
+  沒變的測站整個略過。
+- 用 Agg（不開視窗）；每個工作行程每種時間窗只建一次 Figure / 子圖，
+  換測站時只替換線條與雨量柱的資料再存檔。
+- 測站多時分給 ProcessPoolExecutor（CHART_WORKERS，預設 CPU 數）。
+- 需要 matplotlib（和 fetch_24h / fetch_7d 一樣，不在 requirements.txt；每小時排程用不到）。
+"""
+import os, csv, argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from station_store import StationStore, hour_to_dt
+from tiers import hourly_rain
+from manifest import PublishManifest, content_hash
+import metrics
+
+OUT_DIR = os.getenv("CHART_DIR", "docs/charts")
+DPI = int(os.getenv("CHART_DPI", "110"))
+PNG_LEVEL = int(os.getenv("CHART_PNG_LEVEL", "6"))            # zlib 壓縮等級：越低越快、檔案越大
+WORKERS = int(os.getenv("CHART_WORKERS", str(os.cpu_count() or 1)))
+WINDOWS = {"24h": (24, (11, 8)), "7d": (7 * 24, (12, 9))}     # 時間窗 → (小時數, 圖尺寸)
+
+_figs = {}     # 每個行程各自的 {時間窗: (fig, 線條, 雨量柱, 子圖)}
+
+def _figure(win):
+    """該時間窗的 Figure（同一行程內重複使用）"""
+    if win not in _figs:
+        from matplotlib.figure import Figure        # 不經 pyplot：沒有全域狀態
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=WINDOWS[win][1], dpi=DPI)
+        FigureCanvasAgg(fig)                         # 固定掛 Agg 畫布，存檔時不必每次換畫布、重設 dpi
+        axs = fig.subplots(3, 1, sharex=True)
+        temp, = axs[0].plot([], [])
+        rh, = axs[1].plot([], [])
+        rain = axs[2].stairs([0], [0, 1], fill=True)
+        axs[0].set_ylabel("Temp (°C)")
+        axs[1].set_ylabel("RH (%)")
+        axs[2].set_ylabel("Rain (mm/h)")
+        axs[2].set_xlabel("Local time")
+        for ax in axs:
+            ax.grid(True, alpha=0.3)
+        axs[2].xaxis_date(hour_to_dt(0).tzinfo)
+        # 版面只排一次：先放上與實際等寬的標題、三位數刻度與日期刻度，再 tight_layout，
+        # 之後每張圖只換資料，標題與刻度標籤才不會超出邊界
+        axs[0].set_title("C0XXX0 — 00-00 00:00 ~ 00-00 00:00")
+        for ax in axs:
+            ax.set_ylim(-100, 100)
+        axs[2].set_xlim(0, WINDOWS[win][0] / 24)
+        fig.tight_layout()
+        for ax in axs:
+            ax.set_autoscaley_on(True)               # set_ylim 會關掉自動縮放；y 軸之後仍隨資料調整
+        _figs[win] = fig, temp, rh, rain, axs
+    return _figs[win]
+
+def render(job):
+    """job = (sid, 時間窗, 逐時格的 epoch 小時, 溫度, 濕度, 時雨量, 輸出路徑)；缺的小時為 NaN（線段斷開）"""
+    from matplotlib.dates import date2num
+    sid, win, hours, temp, rh, rain, path = job
+    fig, l_temp, l_rh, bars, axs = _figure(win)
+    x = date2num([hour_to_dt(h) for h in hours.tolist()])
+    l_temp.set_data(x, temp)
+    l_rh.set_data(x, rh)
+    step = 1 / 24
+    bars.set_data(np.nan_to_num(rain), np.r_[x - step / 2, x[-1] + step / 2])
+    axs[0].set_title(f"{sid} — {hour_to_dt(hours[0]):%m-%d %H:%M} ~ {hour_to_dt(hours[-1]):%m-%d %H:%M}")
+    axs[2].set_xlim(x[0] - step / 2, x[-1] + step / 2)
+    for ax in axs:
+        ax.relim(); ax.autoscale_view(scalex=False)
+    # 自己 draw 再交給 PIL 存 RGB（少一個 alpha 通道），比 savefig 快約兩成、檔案也小
+    from PIL import Image
+    fig.canvas.draw()
+    img = Image.frombuffer("RGBA", fig.canvas.get_width_height(), fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+    tmp = path + ".tmp"
+    img.convert("RGB").save(tmp, format="PNG", compress_level=PNG_LEVEL)
+    os.replace(tmp, path)
+    return path
+
+def window(store, sid, hours_back):
+    """最新往回 hours_back 小時的逐時格（缺的小時補 NaN）；沒有資料回 None"""
+    end = store.last_hour(sid)
+    if end is None:
+        return None
+    start = end - hours_back + 1
+    hours, recs = store.read(sid, start - 1, end)      # 多讀一小時，第一格才算得出時雨量
+    rain = hourly_rain(hours, recs["precip"])
+    grid = np.arange(start, end + 1)
+    cols = {k: np.full(len(grid), np.nan) for k in ("temp", "rh", "rain")}
+    keep = hours >= start
+    slot = hours[keep] - start
+    cols["temp"][slot], cols["rh"][slot], cols["rain"][slot] = recs["temp"][keep], recs["rh"][keep], rain[keep]
+    return grid, cols
+
+def main():
+    ap = argparse.ArgumentParser(description="批次輸出測站 24h / 7d 圖")
+    ap.add_argument("sids", nargs="*", help="預設為 app/stations.csv 內所有測站")
+    ap.add_argument("--force", action="store_true", help="不做變動偵測，全部重畫")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args()
+
+    sids = args.sids
+    if not sids:
+        with open("app/stations.csv", newline="", encoding="utf-8") as f:
+            sids = [row["sid"] for row in csv.DictReader(f)]
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    store, manifest = StationStore(), PublishManifest(os.path.join(OUT_DIR, "_manifest.json"))
+    jobs, digests = [], {}
+    for sid in sids:
+        for win, (n, _) in WINDOWS.items():
+            w = window(store, sid, n)
+            if w is None:
+                continue
+            grid, cols = w
+            key, path = f"{sid}_{win}", os.path.join(OUT_DIR, f"{sid}_{win}.png")
+            digest = content_hash(DPI, grid, cols["temp"], cols["rh"], cols["rain"])
+            if not args.force and manifest.unchanged(key, digest, path):
+                metrics.count("charts", result="unchanged")
+                continue
+            digests[key] = digest
+            jobs.append((sid, win, grid, cols["temp"], cols["rh"], cols["rain"], path))
+
+    workers = max(1, min(args.workers, len(jobs)))
+    with metrics.stage("render"):
+        if workers > 1:
+            # 依時間窗排序後分塊，同一行程拿到的多半是同一種圖，Figure 重用率最高
+            jobs.sort(key=lambda j: j[1])
+            with ProcessPoolExecutor(workers) as pool:
+                done = list(pool.map(render, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        else:
+            done = [render(j) for j in jobs]
+    for sid, win, *_ in jobs:
+        manifest.set(f"{sid}_{win}", digests[f"{sid}_{win}"])
+    manifest.flush()
+    metrics.count("charts", len(done), result="rendered")
+    print(f"[charts] 重畫 {len(done)} 張，{len(sids) * len(WINDOWS) - len(done)} 張略過 → {OUT_DIR}")
+
+if __name__ == "__main__":
+    main()
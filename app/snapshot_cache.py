@@ -0,0 +1,132 @@
+import os, gzip, json, time, atexit, threading
+
+CACHE_DIR = os.getenv("SNAPSHOT_CACHE_DIR", ".cache/snapshots")       # 空字串 = 關閉快取
+MAX_MB = float(os.getenv("SNAPSHOT_CACHE_MB", "512"))                 # 總量上限（壓縮後）
+MAX_AGE_DAYS = float(os.getenv("SNAPSHOT_CACHE_DAYS", "60"))          # 超過幾天沒下載、沒讀過就淘汰
+
+class SnapshotCache:
+    """原始快照的本地倉庫：以 (dataset, 觀測整點) 為 key，gzip 壓縮存檔。
+
+    index.json 記錄每個 key 的檔名、大小、觀測時間與最後使用時間，查詢不必掃目錄。
+    整理（「太久沒用 → 超量就淘汰最久沒用的」）與寫回 index 每次 run 只做一次：
+    管線結束時呼叫 close()，沒走管線的（backfill 等）在程式結束時由 atexit 補做。
+    年齡看最後下載/讀取的時間而不是觀測時間，回補下來的舊快照不會一寫進去就被刪掉。
+    """
+
+    def __init__(self, root=CACHE_DIR, max_mb=MAX_MB, max_age_days=MAX_AGE_DAYS):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.index = self._load_index()
+        atexit.register(self.close)
+
+    @staticmethod
+    def key(dataset, dt):
+        return f"{dataset}/{dt:%Y%m%d%H}"
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    def open(self, dataset, dt):
+        """命中回傳可逐塊讀取的 gzip 檔案物件（呼叫端負責關閉）；沒有回 None"""
+        k = self.key(dataset, dt)
+        ent = self.index.get(k)
+        if not ent:
+            return None
+        try:
+            f = gzip.open(os.path.join(self.root, ent["file"]), "rb")
+        except OSError:
+            with self._lock:
+                self.index.pop(k, None); self._dirty = True
+            return None
+        with self._lock:
+            ent["used"] = time.time(); self._dirty = True
+        return f
+
+    def get(self, dataset, dt):
+        """命中回傳解壓後的 bytes；沒有（或檔案遺失）回 None"""
+        f = self.open(dataset, dt)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def put(self, dataset, dt, data):
+        self.put_stream(dataset, dt, [data])
+
+    def put_stream(self, dataset, dt, chunks, on_chunk=None):
+        """逐塊壓縮寫入（不必整包放進記憶體）；on_chunk(chunk) 回傳 True 後就不再呼叫它，
+        讓串流解析器在拿到想要的測站後提早收手，但檔案仍會完整寫完"""
+        k = self.key(dataset, dt)
+        rel = k + ".gz"
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    if on_chunk is not None and on_chunk(chunk):
+                        on_chunk = None
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self.index[k] = {"file": rel, "size": os.path.getsize(path),
+                             "obs": dt.timestamp(), "used": time.time()}
+            self._dirty = True
+
+    def close(self):
+        """每次 run 結束整理一次並寫回 index（可重複呼叫）"""
+        self.evict()
+        self.flush()
+
+    def evict(self):
+        """先丟太久沒用到的，再依最後使用時間丟到總量低於上限"""
+        now = time.time()
+        with self._lock:
+            drop = [k for k, e in self.index.items() if now - e["used"] > self.max_age]
+            total = sum(e["size"] for k, e in self.index.items() if k not in drop)
+            if total > self.max_bytes:
+                for k, e in sorted(self.index.items(), key=lambda kv: kv[1]["used"]):
+                    if total <= self.max_bytes:
+                        break
+                    if k not in drop:
+                        drop.append(k); total -= e["size"]
+            for k in drop:
+                e = self.index.pop(k)
+                try:
+                    os.remove(os.path.join(self.root, e["file"]))
+                except OSError:
+                    pass
+            if drop:
+                self._dirty = True
+
+_default = None
+
+def default_cache():
+    """全程式共用一個實例；SNAPSHOT_CACHE_DIR 設成空字串時回 None"""
+    global _default
+    if _default is None and CACHE_DIR:
+        _default = SnapshotCache()
+    return _default
@@ -0,0 +1,189 @@
+"""本地測站名冊：id / 名稱 / 縣市 / 鄉鎮 / 座標，附縣市鄉鎮索引與格網空間索引。
+
+    python app/station_registry.py --county 臺中市 --town 大里區
+    python app/station_registry.py --near 24.10 120.68 -k 5
+    python app/station_registry.py --near 24.10 120.68 --radius 8 --csv >> app/stations.csv
+
+名冊存在 .cache/stations.json，超過 STATION_REGISTRY_TTL_H 小時才重抓 O-A0001-001；
+查詢都在本地完成。重抓失敗時沿用舊名冊（只印警告）。
+"""
+import os, sys, csv, json, math, time, argparse
+from collections import defaultdict
+from fetcher import BASE_URL, get_sync
+
+REGISTRY_PATH = os.getenv("STATION_REGISTRY", ".cache/stations.json")
+TTL_H = float(os.getenv("STATION_REGISTRY_TTL_H", "24"))
+URL = f"{BASE_URL}/api/v1/rest/datastore/O-A0001-001"
+CELL = 0.1                      # 格網邊長（度），約 11 km
+KM_PER_DEG = 111.195
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+def _parse(s):
+    """O-A0001 的一個 Station → 名冊紀錄（取 WGS84 座標）"""
+    geo = s.get("GeoInfo") or {}
+    coords = geo.get("Coordinates") or []
+    wgs = next((c for c in coords if c.get("CoordinateName") == "WGS84"), coords[-1] if coords else {})
+    try:
+        lat, lon = float(wgs["StationLatitude"]), float(wgs["StationLongitude"])
+    except (KeyError, TypeError, ValueError):
+        lat = lon = None
+    return {"sid": s.get("StationId"), "name": s.get("StationName"),
+            "city": geo.get("CountyName"), "town": geo.get("TownName"), "lat": lat, "lon": lon}
+
+class StationRegistry:
+    """測站名冊；by_id / by_town 索引與 0.1° 格網在載入時建好，查詢不碰網路"""
+
+    def __init__(self, path=REGISTRY_PATH, ttl_h=TTL_H):
+        self.path, self.ttl = path, ttl_h * 3600
+        self.fetched, self.stations = 0.0, []
+        try:
+            with open(path, encoding="utf-8") as f:
+                j = json.load(f)
+            self.fetched, self.stations = j.get("fetched", 0.0), j.get("stations", [])
+        except (OSError, ValueError):
+            pass
+        self._index()
+
+    def _index(self):
+        self.by_id = {s["sid"]: s for s in self.stations}
+        self.by_town = defaultdict(lambda: defaultdict(list))     # city → town → [station]
+        self.grid = defaultdict(list)                              # (列, 行) → [station]
+        for s in self.stations:
+            self.by_town[s["city"]][s["town"]].append(s)
+            if s["lat"] is not None:
+                self.grid[self._cell(s["lat"], s["lon"])].append(s)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return math.floor(lat / CELL), math.floor(lon / CELL)
+
+    @property
+    def expired(self):
+        return time.time() - self.fetched > self.ttl
+
+    def refresh(self):
+        """重抓 O-A0001-001 建名冊；失敗回 False，沿用舊資料"""
+        try:
+            r = get_sync(URL, params={"Authorization": os.getenv("CWA_TOKEN")}, timeout=30)
+            r.raise_for_status()
+            raw = r.json()["records"]["Station"]
+        except Exception as e:
+            print(f"[warn] 測站名冊更新失敗（{type(e).__name__}），沿用舊名冊（{len(self.stations)} 站）", file=sys.stderr)
+            return False
+        self.stations = sorted((_parse(s) for s in raw if s.get("StationId")), key=lambda s: s["sid"])
+        self.fetched = time.time()
+        self._index()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched": self.fetched, "stations": self.stations}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        return True
+
+    def ensure(self):
+        """名冊是空的或過了 TTL 才重抓"""
+        if not self.stations or self.expired:
+            self.refresh()
+        return self
+
+    def get(self, sid):
+        return self.by_id.get(sid)
+
+    def in_town(self, city, town=None):
+        """某縣市（或某鄉鎮）的所有測站"""
+        towns = self.by_town.get(city, {})
+        return list(towns.get(town, [])) if town else [s for ss in towns.values() for s in ss]
+
+    def nearest(self, lat, lon, k=1, within_km=None):
+        """最近的 k 站 [(距離 km, station), ...]；由中心格往外一圈圈找，
+        已找到 k 站且下一圈不可能更近時停止。"""
+        if not self.grid:
+            return []
+        ci, cj = self._cell(lat, lon)
+        # 下一圈的格子離查詢點至少 r 格；經向一格的公里數取名冊最高緯度處（最短）
+        top = max(abs(i) for i, _ in self.grid) + 1
+        step_km = CELL * KM_PER_DEG * math.cos(math.radians(min(89.0, top * CELL)))
+        span = max(max(abs(i - ci), abs(j - cj)) for i, j in self.grid)
+        found = []
+        for r in range(span + 1):
+            for i in range(ci - r, ci + r + 1):
+                for j in range(cj - r, cj + r + 1):
+                    if max(abs(i - ci), abs(j - cj)) != r:
+                        continue
+                    found += [(haversine_km(lat, lon, s["lat"], s["lon"]), s) for s in self.grid.get((i, j), ())]
+            found.sort(key=lambda x: x[0])
+            bound = r * step_km
+            if within_km is not None and bound > within_km:
+                break
+            if len(found) >= k and found[k - 1][0] <= bound:
+                break
+        if within_km is not None:
+            found = [x for x in found if x[0] <= within_km]
+        return found[:k]
+
+    def within(self, lat, lon, km):
+        """半徑 km 內的所有測站（近 → 遠）"""
+        return self.nearest(lat, lon, k=len(self.stations), within_km=km)
+
+_default = None
+
+def default_registry():
+    """全程式共用一個實例（第一次使用時視 TTL 決定是否重抓）"""
+    global _default
+    if _default is None:
+        _default = StationRegistry().ensure()
+    return _default
+
+def main():
+    ap = argparse.ArgumentParser(description="查測站名冊，輸出 stations.csv 列")
+    ap.add_argument("--county", help="縣市，例如 臺中市")
+    ap.add_argument("--town", help="鄉鎮市區，例如 大里區（需搭配 --county）")
+    ap.add_argument("--near", nargs=2, type=float, metavar=("LAT", "LON"))
+    ap.add_argument("-k", type=int, default=5, help="--near 時取最近幾站")
+    ap.add_argument("--radius", type=float, help="--near 時改取半徑幾 km 內的所有測站")
+    ap.add_argument("--sids", nargs="*", help="指定測站代碼")
+    ap.add_argument("--csv", action="store_true", help="輸出 sid,city,town,name（可直接接到 stations.csv）")
+    ap.add_argument("--header", action="store_true", help="--csv 時加上標頭列")
+    ap.add_argument("--skip-existing", metavar="CSV", help="略過這個 stations.csv 裡已有的測站")
+    ap.add_argument("--refresh", action="store_true", help="不管 TTL，先重抓名冊")
+    args = ap.parse_args()
+
+    reg = StationRegistry()
+    if args.refresh:
+        reg.refresh()
+    reg.ensure()
+
+    if args.near:
+        lat, lon = args.near
+        hits = reg.within(lat, lon, args.radius) if args.radius else reg.nearest(lat, lon, args.k)
+    elif args.county:
+        hits = [(None, s) for s in reg.in_town(args.county, args.town)]
+    elif args.sids:
+        hits = [(None, reg.get(sid)) for sid in args.sids if reg.get(sid)]
+    else:
+        ap.error("請給 --county、--near 或 --sids")
+
+    if args.skip_existing:
+        with open(args.skip_existing, newline="", encoding="utf-8") as f:
+            have = {row["sid"] for row in csv.DictReader(f)}
+        hits = [(d, s) for d, s in hits if s["sid"] not in have]
+
+    if args.csv:
+        w = csv.writer(sys.stdout, lineterminator="\n")
+        if args.header:
+            w.writerow(["sid", "city", "town", "name"])
+        for _, s in hits:
+            w.writerow([s["sid"], s["city"], s["town"], s["name"]])
+        return
+    for d, s in hits:
+        where = f"{s['city']} {s['town']}"
+        dist = f"  {d:5.1f} km" if d is not None else ""
+        print(f"- {s['name']} / StationID={s['sid']}  {where}{dist}")
+    print(f"共 {len(hits)} 站（名冊 {len(reg.stations)} 站）", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
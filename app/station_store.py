@@ -0,0 +1,194 @@
+import os, csv, math, argparse
+import numpy as np
+from datetime import datetime, timedelta, timezone
+
+STORE_DIR = os.getenv("STORE_DIR", "data/store")
+LEGACY_CSV = "data/{sid}_hourly.csv"
+TZ = timezone(timedelta(hours=8))   # Asia/Taipei（無日光節約）
+
+# 一小時一格的定長紀錄；flag=1 代表該小時有資料（值本身可以是 NaN）
+HOURLY = np.dtype([("temp", "<f8"), ("rh", "<f8"), ("precip", "<f8"), ("flag", "u1")])
+# CWA 以 -99 / -98 / -999 等值代表儀器故障、無觀測；台灣的溫濕度雨量不可能這麼低
+SENTINEL_MAX = -90.0
+
+def mask_sentinels(v):
+    """特殊代碼（<= SENTINEL_MAX）→ NaN；純量或陣列皆可"""
+    v = np.asarray(v, dtype=float)
+    return np.where(v <= SENTINEL_MAX, np.nan, v)
+
+def to_hour(ts):
+    """datetime / pd.Timestamp / ISO 字串 / epoch 小時 → epoch 小時（int）"""
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=TZ)
+    return int(ts.timestamp()) // 3600
+
+def hour_to_dt(h):
+    return datetime.fromtimestamp(int(h) * 3600, TZ)
+
+def _month_start(y, m):
+    return int(datetime(y, m, 1, tzinfo=TZ).timestamp()) // 3600
+
+def _month_span(y, m):
+    """該月（台北時間）的起始 epoch 小時與總時數"""
+    start = _month_start(y, m)
+    ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
+    return start, _month_start(ny, nm) - start
+
+class StationStore:
+    """逐時資料的儲存引擎：每站一個目錄、每月一個定長二進位檔。
+
+    data/store/<sid>/YYYY-MM.bin 內第 i 筆就是該月第 i 個小時，
+    所以寫入是 seek 到固定位置覆寫（O(1) upsert），讀區間用 memmap 切片，
+    不必每小時把整份歷史讀進來再整份寫回。
+    第一次碰到某站時，若只有舊的 data/<sid>_hourly.csv，會自動轉檔一次。
+    """
+
+    def __init__(self, root=STORE_DIR, dtype=HOURLY, legacy_csv=LEGACY_CSV, sentinels=True):
+        """sentinels：讀出時把特殊代碼當成缺值（觀測用；衍生指標的 store 不需要）"""
+        self.root, self.dtype, self.legacy_csv, self.sentinels = root, dtype, legacy_csv, sentinels
+        self.fields = [f for f in dtype.names if f != "flag"]
+        self._checked = set()
+
+    def _dir(self, sid):
+        return os.path.join(self.root, sid)
+
+    def _path(self, sid, y, m):
+        return os.path.join(self._dir(sid), f"{y:04d}-{m:02d}.bin")
+
+    def _ensure(self, sid):
+        if sid in self._checked:
+            return
+        self._checked.add(sid)
+        legacy = self.legacy_csv.format(sid=sid) if self.legacy_csv else None
+        if not os.path.isdir(self._dir(sid)) and legacy and os.path.exists(legacy):
+            n = self.migrate_csv(sid, legacy)
+            print(f"[store] {legacy} → {self._dir(sid)}（{n} 筆）")
+
+    def _map(self, sid, y, m, create=False):
+        path = self._path(sid, y, m)
+        _, n = _month_span(y, m)
+        if not os.path.exists(path):
+            if not create:
+                return None
+            os.makedirs(self._dir(sid), exist_ok=True)
+            blank = np.zeros(n, dtype=self.dtype)
+            for f in self.fields:
+                blank[f] = np.nan
+            blank.tofile(path)
+        return np.memmap(path, dtype=self.dtype, mode="r+" if create else "r", shape=(n,))
+
+    def months(self, sid):
+        """已有的月份分割（排序）：[(y, m), ...]"""
+        self._ensure(sid)
+        try:
+            names = os.listdir(self._dir(sid))
+        except FileNotFoundError:
+            return []
+        return sorted((int(n[:4]), int(n[5:7])) for n in names if n.endswith(".bin"))
+
+    def upsert_arrays(self, sid, hours, **cols):
+        """hours：epoch 小時陣列；cols：欄位名 → 同長度陣列。同一小時直接覆寫。"""
+        self._ensure(sid)
+        hours = np.asarray(hours, dtype=np.int64)
+        if not len(hours):
+            return 0
+        # 依月份分組，各開一次 memmap 寫入
+        keys = [(d.year, d.month) for d in map(hour_to_dt, hours)]
+        for ym in sorted(set(keys)):
+            idx = np.fromiter((i for i, k in enumerate(keys) if k == ym), dtype=np.int64)
+            start, _ = _month_span(*ym)
+            mm = self._map(sid, *ym, create=True)
+            slots = hours[idx] - start
+            for f in self.fields:
+                if f in cols:
+                    mm[f][slots] = np.asarray(cols[f], dtype=self.dtype[f])[idx]
+            mm["flag"][slots] = 1
+            mm.flush(); del mm
+        return len(hours)
+
+    def upsert(self, sid, rows):
+        """ingest 的逐時紀錄（DateTime / Temperature / RH / Precip）寫入"""
+        rows = list(rows)
+        return self.upsert_arrays(
+            sid, [to_hour(r["DateTime"]) for r in rows],
+            temp=[r["Temperature"] for r in rows], rh=[r["RH"] for r in rows],
+            precip=[r["Precip"] for r in rows])
+
+    def read(self, sid, start=None, end=None):
+        """[start, end]（epoch 小時，含端點）內有資料的小時 → (hours, records)"""
+        hs, recs = [], []
+        for y, m in self.months(sid):
+            m0, n = _month_span(y, m)
+            lo = 0 if start is None else max(0, start - m0)
+            hi = n if end is None else min(n, end - m0 + 1)
+            if lo >= hi:
+                continue
+            mm = self._map(sid, y, m)
+            part = np.array(mm[lo:hi]); del mm
+            if self.sentinels:
+                # 舊資料裡已寫進去的 -99 也在這裡一起擋掉，下游（衍生指標、分層檔、圖、API）都不必再判斷
+                for f in self.fields:
+                    part[f] = mask_sentinels(part[f])
+            keep = np.flatnonzero(part["flag"] == 1)
+            hs.append(keep.astype(np.int64) + m0 + lo)
+            recs.append(part[keep])
+        if not hs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=self.dtype)
+        return np.concatenate(hs), np.concatenate(recs)
+
+    def stamp(self, sid, start=None, end=None):
+        """[start, end] 涵蓋到的月份檔的 (月份, mtime_ns, 大小)；資料有寫入就會變，給快取判斷失效用"""
+        out = []
+        for y, m in self.months(sid):
+            m0, n = _month_span(y, m)
+            if (start is not None and m0 + n <= start) or (end is not None and m0 > end):
+                continue
+            try:
+                st = os.stat(self._path(sid, y, m))
+            except FileNotFoundError:
+                continue
+            out.append((y * 100 + m, st.st_mtime_ns, st.st_size))
+        return tuple(out)
+
+    def last_hour(self, sid):
+        """最新一筆資料的 epoch 小時；沒有資料回 None"""
+        for y, m in reversed(self.months(sid)):
+            m0, _ = _month_span(y, m)
+            mm = self._map(sid, y, m)
+            hit = np.flatnonzero(mm["flag"] == 1); del mm
+            if len(hit):
+                return int(hit[-1]) + m0
+        return None
+
+    def migrate_csv(self, sid, path=None):
+        """舊版 data/<sid>_hourly.csv → 分月二進位檔（可重複執行）"""
+        path = path or self.legacy_csv.format(sid=sid)
+        num = lambda v: float(v) if v not in ("", None) else math.nan
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = [{"DateTime": r["DateTime"], "Temperature": num(r["Temperature"]),
+                     "RH": num(r["RH"]), "Precip": num(r["Precip"])} for r in csv.DictReader(f)]
+        self._checked.add(sid)
+        return self.upsert(sid, rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="逐時資料儲存（data/store）維護工具")
+    ap.add_argument("cmd", choices=["migrate"])
+    ap.add_argument("sids", nargs="*", help="預設為 app/stations.csv 內所有測站")
+    args = ap.parse_args()
+    sids = args.sids
+    if not sids:
+        with open("app/stations.csv", newline="", encoding="utf-8") as f:
+            sids = [row["sid"] for row in csv.DictReader(f)]
+    store = StationStore()
+    for sid in sids:
+        if os.path.exists(LEGACY_CSV.format(sid=sid)):
+            print(f"[ok] {sid}: {store.migrate_csv(sid)} 筆")
+        else:
+            print(f"[skip] {sid}: 沒有 {LEGACY_CSV.format(sid=sid)}")
+
+if __name__ == "__main__":
+    main()
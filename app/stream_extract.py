@@ -0,0 +1,130 @@
+import re, json, codecs
+import xml.etree.ElementTree as ET
+
+_STATION_KEY = re.compile(r'"Station"\s*:\s*([\[{])')
+_SKIP = re.compile(r"[\s,]*")
+_DECODER = json.JSONDecoder()
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]   # 去掉 XML namespace
+
+def _xml_to_dict(elem):
+    """Element → 與 xmltodict 相同形狀的 dict（不含屬性；同名子節點變 list）"""
+    kids = list(elem)
+    if not kids:
+        return elem.text
+    out = {}
+    for k in kids:
+        tag, val = _local(k.tag), _xml_to_dict(k)
+        if tag in out:
+            if not isinstance(out[tag], list):
+                out[tag] = [out[tag]]
+            out[tag].append(val)
+        else:
+            out[tag] = val
+    return out
+
+class StationExtractor:
+    """邊收邊解析 O-A0001 快照，只留下 StationId 在 sids 裡的 Station 節點。
+
+    用法：一塊一塊 feed(bytes)，回傳 True 代表要的測站都到齊、可以停了；
+    結束時呼叫 close()。結果在 self.found = {SID: station dict}。
+    JSON 兩種包裝（records.Station / cwaopendata.dataset.Station）都是找
+    "Station" 這個 key 之後逐筆 raw_decode；XML 走 XMLPullParser，
+    每處理完一個 <Station> 就 clear 掉，記憶體只留目前這一筆。
+    """
+
+    def __init__(self, sids):
+        self.want = {s.upper() for s in sids}
+        self.found = {}
+        self.done = not self.want
+        self._mode = None
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buf, self._pos, self._state = "", 0, "seek"
+        self._xml, self._head = None, b""
+
+    def feed(self, chunk):
+        if self.done or not chunk:
+            return self.done
+        if self._mode is None:
+            # 還看不出格式（只收到 BOM 的一部分或空白）：先存著，和下一塊一起處理
+            chunk = self._head + chunk
+            head = chunk.lstrip(b"\xef\xbb\xbf \t\r\n")
+            if not head:
+                self._head = chunk
+                return False
+            self._head = b""
+            self._mode = "xml" if head[:1] == b"<" else "json"
+            if self._mode == "xml":
+                self._xml = ET.XMLPullParser(events=("end",))
+        if self._mode == "xml":
+            self._xml.feed(chunk)
+            self._drain_xml()
+        else:
+            self._buf += self._text.decode(chunk)
+            self._scan_json()
+        return self.done
+
+    def close(self):
+        if self._mode == "xml" and not self.done:
+            try:
+                self._xml.close()
+            except ET.ParseError:
+                pass
+            self._drain_xml()
+        self.done = True
+        return self.found
+
+    def _keep(self, s):
+        sid = (s.get("StationId") or "").upper() if isinstance(s, dict) else ""
+        if sid in self.want:
+            self.found[sid] = s
+            if len(self.found) == len(self.want):
+                self.done = True
+
+    def _drain_xml(self):
+        for _, elem in self._xml.read_events():
+            if self.done:
+                return
+            if _local(elem.tag) != "Station":
+                continue
+            sid = next((c.text for c in elem if _local(c.tag) == "StationId"), None)
+            if (sid or "").upper() in self.want:
+                self._keep(_xml_to_dict(elem))
+            elem.clear()
+
+    def _scan_json(self):
+        buf = self._buf
+        if self._state == "seek":
+            m = _STATION_KEY.search(buf)
+            if not m:
+                self._buf = buf[-64:]   # key 可能剛好被切在兩塊之間
+                return
+            self._state = "array" if m.group(1) == "[" else "single"
+            self._pos = m.end() - 1 if self._state == "single" else m.end()
+        while not self.done:
+            pos = _SKIP.match(buf, self._pos).end()
+            if pos >= len(buf):
+                break
+            if self._state == "array" and buf[pos] == "]":
+                self.done = True
+                break
+            try:
+                obj, end = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break   # 這一筆還沒收完，等下一塊
+            self._pos = end
+            self._keep(obj)
+            if self._state == "single":
+                self.done = True
+        # 丟掉已處理的部分，buffer 只留未完成的那一筆
+        if self._pos > 65536:
+            self._buf, self._pos = buf[self._pos:], 0
+
+def extract_stream(chunks, sids):
+    """從 bytes 迭代器抽出指定測站，湊齊就提早停止；回傳 {SID: station dict}"""
+    ex = StationExtractor(sids)
+    for chunk in chunks:
+        if ex.feed(chunk):
+            break
+    return ex.close()
@@ -1,12 +1,18 @@
-import os, requests, pandas as pd
+import os, sys, requests, pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv()
+from station_registry import default_registry
 TOKEN = os.getenv("CWA_TOKEN")
 
-# 逐時觀測（全台測站最新整點）
+# 用本地名冊挑出某縣市鄉鎮的測站（python app/test_fetch.py [縣市] [鄉鎮]，預設台中市／大里區）
+city = sys.argv[1] if len(sys.argv) > 1 else "臺中市"
+town = sys.argv[2] if len(sys.argv) > 2 else "大里區"
+sids = {x["sid"] for x in default_registry().in_town(city, town)}
+
+# 逐時觀測（只要名冊挑出的測站，不必下載全台）
 URL_OA0001 = "https://opendata.cwa.gov.tw/api/v1/rest/datastore/O-A0001-001"
-params = {"Authorization": TOKEN}
+params = {"Authorization": TOKEN, "StationId": ",".join(sorted(sids))}
 r = requests.get(URL_OA0001, params=params, timeout=30)
 r.raise_for_status()
 data = r.json()
@@ -14,11 +20,9 @@ data = r.json()
 # 官方 JSON 的結構會放在 data["records"]["Station"]（若未來有異動，再依實際鍵名調整）
 stations = data["records"]["Station"]
 
-# 先用台中市／大里區篩選（CountyName / TownName 來自官方欄位）
 rows = []
 for s in stations:
-    geo = s.get("GeoInfo", {})
-    if geo.get("CountyName") == "臺中市" and geo.get("TownName") == "大里區":
+    if s.get("StationId") in sids:
         we = s.get("WeatherElement", {})
         # 取溫度、濕度；降水量可能在 O-A0001 的 Now.Precipitation，格式要清理
         temp = we.get("AirTemperature")
@@ -26,7 +30,7 @@ for s in stations:
         # 有些站的降水可能在 RainfallElement 底下（不同資料集），先抓 O-A0001 的當日降水欄位試試
         prec = we.get("Now", {}).get("Precipitation") if isinstance(we.get("Now"), dict) else None
         rows.append({
-            "StationId": s.get("StationID"),
+            "StationId": s.get("StationId"),
             "StationName": s.get("StationName"),
             "Time": s.get("ObsTime", {}).get("DateTime"),
             "Temperature": pd.to_numeric(temp, errors="coerce"),
@@ -35,4 +39,4 @@ for s in stations:
         })
 
 df = pd.DataFrame(rows)
-print(df.head())  # 確認有抓到台中市大里區的資料
+print(df.head())  # 確認有抓到該鄉鎮的資料
@@ -0,0 +1,127 @@
+import os, json, numpy as np
+from station_store import hour_to_dt, to_hour
+from payload import VERSION, from_rows, to_rows, write_json
+
+# 各解析度涵蓋的天數：h1 給 24h / 7d 視圖，h3 給 30d 視圖，d1 給長期範圍
+TIERS = {
+    "h1": (1,  int(os.getenv("TIER_H1_DAYS", "8"))),
+    "h3": (3,  int(os.getenv("TIER_H3_DAYS", "31"))),
+    "d1": (24, int(os.getenv("TIER_D1_DAYS", "366"))),
+}
+
+def bucket_start(hours, width):
+    """epoch 小時 → 所屬區間（以台北時間對齊，例如 00/03/06 時、每日 0 時）的起點"""
+    return (np.asarray(hours) + 8) // width * width - 8
+
+def hourly_rain(hours, precip):
+    """O-A0001 的 Now.Precipitation 是「當日累積雨量」→ 換算成每小時雨量
+
+    與前一小時相減；累積值變小（跨日歸零）時取當下值；
+    前一小時缺資料、或任一小時為負值（特殊代碼）時為 NaN（台北 01 時除外：累積值本身就是該小時雨量）。
+    """
+    hours = np.asarray(hours); acc = np.asarray(precip, dtype=float)
+    acc = np.where(acc < 0, np.nan, acc)
+    inc = np.full(len(acc), np.nan)
+    if len(acc):
+        prev = np.r_[np.nan, acc[:-1]]
+        prev_ok = np.r_[False, np.diff(hours) == 1] & ~np.isnan(prev)
+        diff = acc - prev
+        inc = np.where(prev_ok, np.where(diff >= 0, diff, acc), np.nan)
+        # 當日第一個小時（台北 01 時）的累積值本身就是這一小時的雨量
+        inc = np.where(~prev_ok & ((hours + 8) % 24 == 1), acc, inc)
+    return inc
+
+def aggregate(hours, recs, width, rain=None):
+    """依區間聚合：溫濕度 min / mean / max（略過 NaN）、雨量加總（每小時雨量）"""
+    b = bucket_start(hours, width)
+    starts, first = np.unique(b, return_index=True)
+    out = {"t": starts}
+    if not len(starts):
+        return out
+    for f in ("temp", "rh"):
+        v = np.asarray(recs[f], dtype=float)
+        ok = ~np.isnan(v)
+        n = np.add.reduceat(ok.astype(int), first)
+        s = np.add.reduceat(np.where(ok, v, 0.0), first)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[f + "_mean"] = np.where(n > 0, s / np.maximum(n, 1), np.nan)
+        out[f + "_min"] = np.fmin.reduceat(v, first)
+        out[f + "_max"] = np.fmax.reduceat(v, first)
+    r = hourly_rain(hours, recs["precip"]) if rain is None else rain
+    ok = ~np.isnan(r)
+    out["rain"] = np.where(np.add.reduceat(ok.astype(int), first) > 0,
+                           np.add.reduceat(np.where(ok, r, 0.0), first), np.nan)
+    return out
+
+def _num(v, nd=2):
+    return None if np.isnan(v) else round(float(v), nd)
+
+def _rows(tier, hours, recs, lo):
+    """區間 [lo, ...] 的資料 → 該層的 JSON 列"""
+    width, _ = TIERS[tier]
+    keep = hours >= lo
+    rain = hourly_rain(hours, recs["precip"])[keep]
+    if tier == "h1":
+        # 原始逐時溫濕度；雨量和 h3 / d1 一樣是時雨量（不是當日累積）
+        h, r = hours[keep], recs[keep]
+        return [{"t": hour_to_dt(t).isoformat(), "temp": _num(a), "rh": _num(b), "rain": _num(p, 1)}
+                for t, a, b, p in zip(h.tolist(), r["temp"], r["rh"], rain)]
+    agg = aggregate(hours[keep], recs[keep], width, rain)
+    rows = []
+    for i, t in enumerate(agg["t"].tolist()):
+        row = {"t": hour_to_dt(t).isoformat(), "temp": _num(agg["temp_mean"][i]),
+               "rh": _num(agg["rh_mean"][i]), "rain": _num(agg["rain"][i], 1)}
+        if tier == "d1":
+            row.update(tmin=_num(agg["temp_min"][i]), tmax=_num(agg["temp_max"][i]),
+                       rhmin=_num(agg["rh_min"][i]), rhmax=_num(agg["rh_max"][i]))
+        rows.append(row)
+    return rows
+
+def _load(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+FORMAT = 3        # 分層檔格式，有變就整段重算（2：h1 的 rain 改為時雨量；3：溫濕度特殊代碼視為缺值）
+
+FIELDS = {"h1": ("temp", "rh", "rain"), "h3": ("temp", "rh", "rain"),
+          "d1": ("temp", "rh", "rain", "tmin", "tmax", "rhmin", "rhmax")}
+
+def export_tiers(store, sid, since=None, out_dir="docs/data"):
+    """輸出 <sid>.h1 / .h3 / .d1.json，只重算有變動的區間
+
+    since：這次寫進 store 的最早小時（epoch 小時）；None 代表沒有新資料，
+    只把舊檔滑動到新的時間窗。舊檔不存在或天數設定變了就整段重算。
+    """
+    end = store.last_hour(sid)
+    if end is None:
+        return []
+    paths = []
+    for tier, (width, days) in TIERS.items():
+        path = os.path.join(out_dir, f"{sid}.{tier}.json")
+        lo = int(bucket_start(end - days * 24 + 1, width))
+        old = _load(path)
+        if old and old.get("v") == VERSION and old.get("days") == days and old.get("format") == FORMAT:
+            # 舊檔可沿用：只重算 since 所在區間之後；沒有新資料就只做時間窗滑動
+            prev = old["series"]
+            old = to_rows(prev)
+            redo = max(lo, int(bucket_start(since, width))) if since is not None else end + 1
+            kept = [r for r in old if lo <= to_hour(r["t"]) < redo]
+        else:
+            prev, old, redo, kept = None, None, lo, []
+        fresh = []
+        if redo <= end:
+            # 多讀前一小時，才算得出區間第一個小時的雨量
+            hours, recs = store.read(sid, redo - 1, end)
+            fresh = _rows(tier, hours, recs, redo)
+        paths.append(path)
+        if old and not fresh and len(kept) == len(old):
+            continue
+        series = from_rows(kept + fresh, width * 3600, FIELDS[tier])
+        if series == prev:
+            continue          # 重抓的小時值沒變：不動檔案
+        write_json(path, {"v": VERSION, "station": sid, "tier": tier, "days": days, "format": FORMAT,
+                          "series": series})
+    return paths
@@ -0,0 +1,123 @@
+"""本地查詢 API（app/api_server.py）的延遲 / 吞吐基準
+
+    python bench/bench_api.py --stations 50 --days 365 --clients 8 --requests 400
+
+在暫存目錄用合成資料建 store（逐時、每站 --days 天），起一個 api_server（同行程、隨機埠），
+以 --clients 條 keep-alive 連線同時打下列情境，各印出 p50 / p95 / 吞吐：
+
+- cold：每個請求的區間都不同（LRU 一律未命中，量讀 store + 降採樣 + 序列化）
+- hot：同一組熱門查詢重複打（LRU 命中）
+- revalidate：帶 If-None-Match（304，不傳內容）
+"""
+import os, sys, time, random, shutil, argparse, tempfile, threading, http.client
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+from station_store import StationStore, to_hour
+from derived import DerivedStore
+from api_server import SeriesService, make_server
+
+def build_store(root, n, days, seed=0):
+    """n 站 × days 天的合成逐時資料（日夜溫差 + 雜訊；每天累積雨量跨日歸零）"""
+    rng = np.random.default_rng(seed)
+    store = StationStore(os.path.join(root, "store"), legacy_csv=None)
+    end = to_hour("2026-10-01T00:00:00")
+    hours = np.arange(end - days * 24, end)
+    local = (hours + 8) % 24
+    stations = []
+    for i in range(n):
+        sid = f"S{i:04d}"
+        temp = 24 + 5 * np.sin((local - 9) / 24 * 2 * np.pi) + rng.normal(0, 0.8, len(hours))
+        rh = np.clip(75 - 2 * (temp - 24) + rng.normal(0, 4, len(hours)), 20, 100)
+        inc = np.where(rng.random(len(hours)) < 0.08, rng.gamma(1.2, 3, len(hours)), 0)
+        day = (hours + 8) // 24
+        acc = np.zeros(len(hours))
+        for k in range(1, len(hours)):
+            acc[k] = inc[k] + (acc[k - 1] if day[k] == day[k - 1] else 0)
+        store.upsert_arrays(sid, hours, temp=temp, rh=rh, precip=acc)
+        stations.append({"sid": sid, "city": "臺中市", "town": "測試區", "name": sid})
+    derived = DerivedStore(os.path.join(root, "derived"))
+    derived.update(store, {s["sid"]: None for s in stations})
+    return stations, store, derived, int(hours[0]), int(hours[-1])
+
+def drive(port, paths, clients, headers=None):
+    """clients 條連線平分 paths；回傳 (各請求延遲秒數, 總耗時, 狀態碼統計)"""
+    lat, codes, lock = [], {}, threading.Lock()
+
+    def worker(mine):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for p in mine:
+            t = time.perf_counter()
+            conn.request("GET", p, headers=headers(p) if headers else {"Accept-Encoding": "gzip"})
+            r = conn.getresponse(); r.read()
+            dt = time.perf_counter() - t
+            with lock:
+                lat.append(dt); codes[r.status] = codes.get(r.status, 0) + 1
+        conn.close()
+
+    ts = [threading.Thread(target=worker, args=(paths[i::clients],)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return lat, time.perf_counter() - t0, codes
+
+def report(name, lat, wall, codes):
+    v = sorted(lat)
+    pct = lambda q: v[min(len(v) - 1, int(q * len(v)))] * 1e3
+    print(f"{name:10s} {len(v):5d} req  p50 {pct(0.5):7.2f} ms  p95 {pct(0.95):7.2f} ms  "
+          f"{len(v) / wall:8.1f} req/s  {codes}")
+
+def main():
+    ap = argparse.ArgumentParser(description="api_server 延遲 / 吞吐基準")
+    ap.add_argument("--stations", type=int, default=50)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--per-query", type=int, default=5, help="每個請求查幾站")
+    ap.add_argument("--points", type=int, default=500)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--method", default="minmax", choices=["minmax", "lttb"])
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="cwa-bench-api-")
+    try:
+        t = time.perf_counter()
+        stations, store, derived, first, last = build_store(root, args.stations, args.days)
+        print(f"[bench] 合成 {args.stations} 站 × {args.days} 天：{time.perf_counter() - t:.1f}s")
+        srv = make_server("127.0.0.1", 0, SeriesService(stations, store, derived))
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        port = srv.server_address[1]
+
+        rng = random.Random(0)
+        sids = [s["sid"] for s in stations]
+
+        def path(span_days, fields="temp,rh,rain"):
+            span_days = min(span_days, (last - first) // 24)
+            end = rng.randint(first + span_days * 24, last)
+            pick = ",".join(rng.sample(sids, min(args.per_query, len(sids))))
+            t0 = time.strftime("%Y-%m-%dT%H:00", time.gmtime((end - span_days * 24) * 3600 + 8 * 3600))
+            t1 = time.strftime("%Y-%m-%dT%H:00", time.gmtime(end * 3600 + 8 * 3600))
+            return f"/api/series?sids={pick}&start={t0}&end={t1}&points={args.points}&method={args.method}&fields={fields}"
+
+        cold = [path(rng.choice([7, 30, 90, 365])) for _ in range(args.requests)]
+        report("cold", *drive(port, cold, args.clients))
+
+        hot_set = [path(30) for _ in range(10)]
+        drive(port, hot_set, 1)                                   # 先暖好 LRU
+        hot = [rng.choice(hot_set) for _ in range(args.requests)]
+        report("hot", *drive(port, hot, args.clients))
+
+        etags = {}
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for p in hot_set:
+            conn.request("GET", p); r = conn.getresponse(); r.read()
+            etags[p] = r.getheader("ETag")
+        conn.close()
+        report("revalidate", *drive(port, hot, args.clients, lambda p: {"If-None-Match": etags[p]}))
+        srv.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""預報整形（F-D0047 區間展開 + 每日中位數）的微基準：舊版逐鄉鎮、逐小時迴圈 vs 全鄉鎮一次向量化。
+
+    python bench/bench_forecast.py --towns 300 --repeat 3
+
+會先確認兩版輸出一致，再印出各自耗時與加速倍數。
+"""
+import os, sys, time, random, argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+from forecast import _expand_locations, shape_forecasts
+
+# --- 舊版實作（原 ci_update.fetch_forecast 的整形部分），作為對照組 ---
+def legacy_series(loc):
+    we = {e["elementName"]: e for e in loc["weatherElement"]}
+    out = {}
+    for elem in ("T", "RH"):
+        if elem not in we:
+            continue
+        for tslot in we[elem]["time"]:
+            start = pd.to_datetime(tslot.get("startTime"))
+            end   = pd.to_datetime(tslot.get("endTime"))
+            val   = float(tslot["elementValue"][0]["value"])
+            t = start
+            while t < end:
+                out.setdefault(t, {})[elem] = val
+                t += pd.Timedelta(hours=1)
+    rows = []
+    for t in sorted(out.keys()):
+        rows.append({"t": t, "temp": out[t].get("T"), "rh": out[t].get("RH")})
+    return rows
+
+def legacy_shape(loc, now):
+    hourly = legacy_series(loc)
+    h8 = [r for r in hourly if r["t"] > now][:8]
+
+    def day_bucket(rows, days):
+        end = now + pd.Timedelta(days=days)
+        cur = [r for r in rows if now < r["t"] <= end]
+        by_day = {}
+        for r in cur:
+            by_day.setdefault(r["t"].date(), []).append(r)
+        out = []
+        for d in sorted(by_day.keys()):
+            tt = [x["temp"] for x in by_day[d] if x["temp"] is not None]
+            hh = [x["rh"]   for x in by_day[d] if x["rh"]   is not None]
+            out.append({"t": pd.Timestamp(d).tz_localize("Asia/Taipei"),
+                        "temp": (pd.Series(tt).median() if tt else None),
+                        "rh":   (pd.Series(hh).median() if hh else None)})
+        return out
+
+    to_json = lambda rows: [{"t": r["t"].isoformat(), "temp": r["temp"], "rh": r["rh"]} for r in rows]
+    return {"24h": to_json(h8), "7d": to_json(day_bucket(hourly, 3)), "30d": to_json(day_bucket(hourly, 7))}
+
+def new_shape_all(locs, now):
+    return shape_forecasts(_expand_locations(locs), now)
+
+# --- 合成資料：T 為 3 小時區間、RH 為 6 小時區間，共 7 天 ---
+def synth_town(i, t0, rng):
+    def blocks(step, lo, hi):
+        out, t = [], t0
+        while t < t0 + pd.Timedelta(days=7):
+            e = t + pd.Timedelta(hours=step)
+            out.append({"startTime": t.isoformat(), "endTime": e.isoformat(),
+                        "elementValue": [{"value": str(rng.randint(lo, hi)), "measures": "攝氏度"}]})
+            t = e
+        return out
+    return {"locationName": f"town{i}", "weatherElement": [
+        {"elementName": "T", "time": blocks(3, 15, 34)},
+        {"elementName": "RH", "time": blocks(6, 40, 99)},
+    ]}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--towns", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    now = pd.Timestamp.now(tz="Asia/Taipei").floor("h")
+    t0 = (now - pd.Timedelta(hours=2)).tz_convert("+08:00")
+    towns = [synth_town(i, t0, rng) for i in range(args.towns)]
+
+    shaped = new_shape_all(towns, now)
+    for loc in towns[:20]:
+        assert legacy_shape(loc, now) == shaped[loc["locationName"]], loc["locationName"]
+
+    def timeit(fn):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+        return best
+
+    old = timeit(lambda: [legacy_shape(loc, now) for loc in towns])
+    new = timeit(lambda: new_shape_all(towns, now))
+    print(f"{args.towns} 個鄉鎮：舊版 {old:.3f}s（{old / args.towns * 1e3:.2f} ms/鄉鎮）"
+          f"  向量化 {new:.3f}s（{new / args.towns * 1e3:.2f} ms/鄉鎮）  ×{old / new:.1f}")
+
+if __name__ == "__main__":
+    main()
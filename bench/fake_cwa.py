@@ -0,0 +1,242 @@
+"""本地的 CWA 開放資料替身伺服器（只供基準測試 / 離線開發用）
+
+    python bench/fake_cwa.py --port 8765 --snapshot 700 --latency 0.02 --missing 0.01
+
+之後把 CWA_BASE_URL 指到 http://127.0.0.1:8765、CWA_TOKEN 隨便填即可跑 app/ 底下的程式。
+提供的端點（路徑與回應結構比照正式站，內容為可重現的合成資料）：
+
+- /historyapi/v1/getData/O-A0001-001/YYYY/MM/DD/HH/00/00  某小時的全台自動站快照
+- /historyapi/v1/getMetadata/O-A0001-001                   最近 --meta-hours 小時的可用清單
+- /api/v1/rest/datastore/O-A0001-001                       最新一個已發布整點的快照（--publish-delay 秒後才換成新整點；
+                                                           帶 ETag / Last-Modified，條件式請求沒變時回 304）
+- /api/v1/rest/datastore/F-D0047-xxx?locationName=...      鄉鎮逐 3/6 小時預報
+- /_stats                                                  各端點被打了幾次（JSON）
+
+同一個 --seed 下，同一小時的快照內容固定；--missing 比例的小時固定回 404（模擬檔案未生成），
+--fail 比例的請求隨機回 503（模擬尖峰時的伺服器錯誤）。--port 0 會自動挑埠號並印出
+「READY <port>」，讓 run_bench.py 之類的呼叫端讀取。
+"""
+import gzip, json, time, random, argparse, threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from email.utils import formatdate
+
+TZ = timezone(timedelta(hours=8))
+CITIES = {"臺中市": "F-D0047-073", "南投縣": "F-D0047-061", "彰化縣": "F-D0047-053"}
+TOWNS_PER_CITY = 20
+
+def station_id(i):
+    return f"B{i:05d}"
+
+def station_meta(i):
+    """第 i 站的 (city, town, name)；run_bench 產生 stations.csv 也用這個"""
+    cities = list(CITIES)
+    city = cities[i % len(cities)]
+    return city, f"鄉鎮{(i // len(cities)) % TOWNS_PER_CITY:02d}", f"測站{i:05d}"
+
+def pick_stations(n, total):
+    """從 total 站裡平均挑 n 站（頭尾都會挑到，串流解析無法提早收手，量到的是最壞情況）"""
+    if n >= total:
+        return list(range(total))
+    if n == 1:
+        return [total - 1]
+    return sorted({round(k * (total - 1) / (n - 1)) for k in range(n)})
+
+class Snapshots:
+    """合成的全台快照。每站的 JSON 先做成模板（座標、站名等固定欄位只序列化一次），
+    每小時只填入觀測值，伺服器本身才不會成為基準測試的瓶頸。"""
+
+    FIELDS = ("obs", "t", "hi", "lo", "rh", "p", "wd", "ws", "ap", "gust", "gd")
+
+    def __init__(self, size, seed, missing):
+        self.size, self.seed, self.missing = size, seed, missing
+        self._cache, self._lock = OrderedDict(), threading.Lock()
+        self._tpl = [self._template(i) for i in range(size)]
+
+    def is_missing(self, hour):
+        return self.missing > 0 and random.Random(f"{self.seed}:404:{hour:%Y%m%d%H}").random() < self.missing
+
+    def _template(self, i):
+        city, town, name = station_meta(i)
+        rng = random.Random(f"{self.seed}:geo:{i}")
+        ph = {f: f"@{f}@" for f in self.FIELDS}
+        coord = lambda n: {"CoordinateName": n, "CoordinateFormat": "decimal degrees",
+                           "StationLatitude": round(22 + rng.random() * 3, 6),
+                           "StationLongitude": round(120 + rng.random() * 2, 6)}
+        node = {
+            "StationName": name, "StationId": station_id(i), "ObsTime": {"DateTime": ph["obs"]},
+            "GeoInfo": {"Coordinates": [coord("TWD67"), coord("WGS84")],
+                        "StationAltitude": str(round(rng.random() * 2000, 1)),
+                        "CountyName": city, "TownName": town, "CountyCode": "66000", "TownCode": "6600100"},
+            "WeatherElement": {
+                "Weather": "-99", "VisibilityDescription": "-99", "SunshineDuration": -99,
+                "Now": {"Precipitation": ph["p"]},
+                "WindDirection": ph["wd"], "WindSpeed": ph["ws"],
+                "AirTemperature": ph["t"], "RelativeHumidity": ph["rh"],
+                "AirPressure": ph["ap"], "UVIndex": -99,
+                "Max10MinAverage": {"WindSpeed": -99, "Occurred_at": {"WindDirection": -99, "DateTime": ph["obs"]}},
+                "GustInfo": {"PeakGustSpeed": ph["gust"],
+                             "Occurred_at": {"WindDirection": ph["gd"], "DateTime": ph["obs"]}},
+                "DailyExtreme": {
+                    "DailyHigh": {"TemperatureInfo": {"AirTemperature": ph["hi"], "Occurred_at": {"DateTime": ph["obs"]}}},
+                    "DailyLow": {"TemperatureInfo": {"AirTemperature": ph["lo"], "Occurred_at": {"DateTime": ph["obs"]}}}},
+            },
+        }
+        tpl = json.dumps(node, ensure_ascii=False)
+        for f in self.FIELDS:
+            tpl = tpl.replace(f'"@{f}@"', '"%(obs)s"' if f == "obs" else f"%({f})s")
+        return tpl
+
+    RAIN = (0.0, 0.0, 0.0, 0.5, 2.0, 8.0)
+
+    def _values(self, rng, i, hour, obs):
+        # 每站每天固定一個降雨強度 → Now.Precipitation 為當日累積值，跨日歸零
+        rain_rate = self.RAIN[(i * 7919 + hour.toordinal() * 104729 + self.seed) % len(self.RAIN)]
+        t = round(18 + 10 * rng.random(), 1)
+        return {"obs": obs, "t": t, "hi": round(t + 2, 1), "lo": round(t - 3, 1),
+                "rh": round(50 + 50 * rng.random()), "p": round(rain_rate * hour.hour, 1),
+                "wd": round(rng.random() * 360), "ws": round(rng.random() * 8, 1),
+                "ap": round(990 + 30 * rng.random(), 1), "gust": round(rng.random() * 15, 1),
+                "gd": round(rng.random() * 360)}
+
+    def body(self, hour, gz):
+        """某小時快照的 JSON（結果留在小型 LRU，重試不必重算）"""
+        key = (hour, gz)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        rng = random.Random(f"{self.seed}:{hour:%Y%m%d%H}")
+        obs = hour.isoformat()
+        stations = ",".join(tpl % self._values(rng, i, hour, obs) for i, tpl in enumerate(self._tpl))
+        raw = ('{"success": "true", "result": {"resource_id": "O-A0001-001", "fields": []}, '
+               '"records": {"Station": [' + stations + "]}}").encode("utf-8")
+        raw = gzip.compress(raw, 5) if gz else raw
+        with self._lock:
+            self._cache[key] = raw
+            while len(self._cache) > 32:
+                self._cache.popitem(last=False)
+        return raw
+
+def forecast_body(ds, towns, seed, now):
+    """F-D0047：T 每 3 小時、RH 每 6 小時，涵蓋 7 天"""
+    start = now.replace(minute=0, second=0, microsecond=0)
+    start -= timedelta(hours=start.hour % 3)
+
+    def blocks(step, lo, hi, rng):
+        out, t = [], start
+        while t < start + timedelta(days=7):
+            e = t + timedelta(hours=step)
+            out.append({"startTime": t.isoformat(), "endTime": e.isoformat(),
+                        "elementValue": [{"value": str(rng.randint(lo, hi)), "measure": "C"}]})
+            t = e
+        return out
+
+    locs = []
+    for town in towns:
+        rng = random.Random(f"{seed}:{ds}:{town}:{start:%Y%m%d%H}")
+        locs.append({"locationName": town, "geocode": "0", "lat": "24.1", "lon": "120.6",
+                     "weatherElement": [{"elementName": "T", "description": "溫度", "time": blocks(3, 15, 34, rng)},
+                                        {"elementName": "RH", "description": "相對濕度", "time": blocks(6, 40, 99, rng)}]})
+    return {"success": "true", "records": {"locations": [{"datasetDescription": "鄉鎮天氣預報", "dataid": ds,
+                                                          "location": locs}]}}
+
+def make_handler(args):
+    snaps = Snapshots(args.snapshot, args.seed, args.missing)
+    stats, lock = Counter(), threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def send(self, code, body=b"", gz=False, headers=()):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if gz:
+                self.send_header("Content-Encoding", "gzip")
+            for k, v in headers:
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            q = parse_qs(u.query)
+            parts = u.path.strip("/").split("/")
+            kind = "stats" if u.path == "/_stats" else (
+                "getData" if "getData" in parts else "getMetadata" if "getMetadata" in parts else
+                parts[-1] if "datastore" in parts else "other")
+            with lock:
+                stats[kind] += 1
+            if kind == "stats":
+                return self.send(200, json.dumps(stats).encode())
+            if args.latency:
+                time.sleep(args.latency)
+            if kind != "getMetadata" and args.fail and random.random() < args.fail:
+                return self.send(503)
+            gz = args.gzip and "gzip" in (self.headers.get("Accept-Encoding") or "")
+            now = datetime.now(TZ).replace(minute=0, second=0, microsecond=0)
+
+            if kind == "getData":
+                try:
+                    y, m, d, h = map(int, parts[-6:-2])
+                    hour = datetime(y, m, d, h, tzinfo=TZ)
+                except ValueError:
+                    return self.send(400)
+                if hour > now or snaps.is_missing(hour):
+                    return self.send(404)
+                return self.send(200, snaps.body(hour, gz), gz)
+            if kind == "getMetadata":
+                base = f"http://{self.headers.get('Host')}/historyapi/v1/getData/O-A0001-001"
+                times = [now - timedelta(hours=k) for k in range(args.meta_hours)]
+                items = [{"DateTime": t.isoformat(), "ProductURL": f"{base}/{t:%Y/%m/%d/%H/00/00}"}
+                         for t in reversed(times) if not snaps.is_missing(t)]
+                body = {"dataset": {"resources": {"resource": {"data": {"time": items}}}}}
+                return self.send(200, json.dumps(body).encode())
+            if kind == "O-A0001-001":
+                hour = (datetime.now(TZ) - timedelta(seconds=args.publish_delay)).replace(
+                    minute=0, second=0, microsecond=0)
+                etag = f'"{hour:%Y%m%d%H}"'
+                validators = [("ETag", etag), ("Last-Modified", formatdate(hour.timestamp() + args.publish_delay,
+                                                                           usegmt=True))]
+                if etag in (self.headers.get("If-None-Match") or ""):
+                    with lock:
+                        stats["not_modified"] += 1
+                    return self.send(304, headers=validators)
+                return self.send(200, snaps.body(hour, gz), gz, validators)
+            if kind.startswith("F-D0047"):
+                towns = [t for t in ",".join(q.get("locationName", [])).split(",") if t]
+                towns = towns or [f"鄉鎮{j:02d}" for j in range(TOWNS_PER_CITY)]
+                body = json.dumps(forecast_body(kind, towns, args.seed, now), ensure_ascii=False).encode()
+                return self.send(200, gzip.compress(body, 5) if gz else body, gz)
+            return self.send(404)
+
+    return Handler
+
+def main():
+    ap = argparse.ArgumentParser(description="CWA 開放資料替身伺服器")
+    ap.add_argument("--port", type=int, default=8765, help="0 = 自動挑選，並印出 READY <port>")
+    ap.add_argument("--snapshot", type=int, default=700, help="每份全台快照的測站數")
+    ap.add_argument("--latency", type=float, default=0.02, help="每個請求額外等待秒數")
+    ap.add_argument("--missing", type=float, default=0.01, help="固定回 404 的小時比例")
+    ap.add_argument("--fail", type=float, default=0.0, help="隨機回 503 的請求比例")
+    ap.add_argument("--meta-hours", type=int, default=720, help="getMetadata 列出幾小時")
+    ap.add_argument("--gzip", action="store_true", help="用戶端接受時以 gzip 傳送")
+    ap.add_argument("--publish-delay", type=float, default=0, help="即時資料在整點後幾秒才換成新整點")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    srv = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args))
+    srv.daemon_threads = True
+    print(f"READY {srv.server_address[1]}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""ci_update 的端到端基準：對本地替身伺服器（fake_cwa.py）跑「測站數 × 小時數」情境。
+
+    python bench/run_bench.py                       # 全部 9 個情境，和 bench/baseline.json 比較
+    python bench/run_bench.py --stations 4,50 --hours 24,168
+    python bench/run_bench.py --save                # 把這次結果寫成新的 baseline
+
+每個情境在獨立的暫存目錄跑兩次 app/ci_update.py（子行程）：
+cold = 空的 store / 快取（第一次上線、或補大量缺口），warm = 緊接著再跑一次（平常每小時的增量）。
+量的是整體耗時與子行程的峰值 RSS；請求數、下載量、各階段時間取自該次的 .cache/metrics.json。
+比 baseline 慢（或吃記憶體）超過 --tolerance 就回傳非零結束碼，可放進 CI。
+"""
+import os, sys, csv, json, time, shutil, argparse, platform, tempfile, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from fake_cwa import station_id, station_meta, pick_stations
+
+BASELINE = os.path.join(HERE, "baseline.json")
+METRICS = ("wall_s", "peak_rss_mb")
+FLOOR = {"wall_s": 0.5, "peak_rss_mb": 10}     # 低於這個差距視為雜訊，不算退步
+
+def start_server(args):
+    cmd = [sys.executable, os.path.join(HERE, "fake_cwa.py"), "--port", "0", "--snapshot", str(args.snapshot),
+           "--latency", str(args.latency), "--missing", str(args.missing), "--fail", str(args.fail)]
+    if args.gzip:
+        cmd.append("--gzip")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("READY"):
+        proc.kill()
+        raise RuntimeError(f"fake_cwa 沒有啟動：{line!r}")
+    return proc, f"http://127.0.0.1:{line.split()[1]}"
+
+def write_stations(workdir, n, total):
+    os.makedirs(os.path.join(workdir, "app"), exist_ok=True)
+    with open(os.path.join(workdir, "app", "stations.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["sid", "city", "town", "name"])
+        for i in pick_stations(n, total):
+            w.writerow([station_id(i), *station_meta(i)])
+
+def run_once(workdir, env):
+    """在 workdir 跑一次 ci_update；回傳耗時、峰值 RSS 與 metrics.json 摘要"""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "app", "ci_update.py")], cwd=workdir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        sys.stderr.write(out.decode("utf-8", "replace"))
+        raise RuntimeError(f"ci_update 結束碼 {proc.returncode}")
+    # Linux 的 ru_maxrss 單位是 KB，macOS 是 bytes
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    res = {"wall_s": round(wall, 2), "peak_rss_mb": round(rss, 1)}
+    try:
+        with open(os.path.join(workdir, ".cache", "metrics.json"), encoding="utf-8") as f:
+            m = json.load(f)
+        res["requests"] = int(sum(m["counters"].get("http_requests", {}).values()))
+        res["mb"] = round(m["counters"].get("http_bytes", {}).get("total", 0) / 1e6, 1)
+        res["stages"] = {k: v["wall_s"] for k, v in m["stages"].items()}
+    except (OSError, ValueError, KeyError):
+        pass
+    return res
+
+def run_scenario(args, base_url, n, hours):
+    workdir = tempfile.mkdtemp(prefix=f"cwa-bench-{n}x{hours}-")
+    try:
+        write_stations(workdir, n, args.snapshot)
+        env = dict(os.environ, CWA_TOKEN="bench", CWA_BASE_URL=base_url, HOURS_PER_RUN=str(hours),
+                   FETCH_RATE=str(args.rate), FETCH_CONCURRENCY=str(args.concurrency),
+                   FETCH_BACKOFF="0.05", PYTHONWARNINGS="ignore")
+        env.pop("METRICS_PROM_PATH", None); env.pop("CWA_PROFILE", None)
+        return {"cold": run_once(workdir, env), "warm": run_once(workdir, env)}
+    finally:
+        if args.keep:
+            print(f"  （保留 {workdir}）")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(results, baseline, tol):
+    """回傳退步清單 [(情境, 階段, 指標, baseline, 本次)]"""
+    bad = []
+    for name, phases in results.items():
+        for phase, cur in phases.items():
+            ref = baseline.get("scenarios", {}).get(name, {}).get(phase)
+            if not ref:
+                continue
+            for k in METRICS:
+                if k in ref and cur[k] > ref[k] * (1 + tol) and cur[k] - ref[k] > FLOOR[k]:
+                    bad.append((name, phase, k, ref[k], cur[k]))
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="ci_update 端到端基準（本地替身伺服器）")
+    ap.add_argument("--stations", default="4,50,500", help="追蹤的測站數（逗號分隔）")
+    ap.add_argument("--hours", default="24,168,720", help="HOURS_PER_RUN（逗號分隔）")
+    ap.add_argument("--snapshot", type=int, default=700, help="每份全台快照的測站數")
+    ap.add_argument("--latency", type=float, default=0.02)
+    ap.add_argument("--missing", type=float, default=0.01)
+    ap.add_argument("--fail", type=float, default=0.0)
+    ap.add_argument("--gzip", action="store_true")
+    ap.add_argument("--rate", type=float, default=0, help="FETCH_RATE（0 = 不限速，量程式本身的吞吐）")
+    ap.add_argument("--concurrency", type=int, default=6)
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--tolerance", type=float, default=0.3, help="允許比 baseline 多出的比例")
+    ap.add_argument("--save", action="store_true", help="把結果寫進 --baseline")
+    ap.add_argument("--keep", action="store_true", help="保留各情境的暫存目錄")
+    args = ap.parse_args()
+
+    grid = [(int(n), int(h)) for n in args.stations.split(",") for h in args.hours.split(",")]
+    server, base_url = start_server(args)
+    results = {}
+    try:
+        for n, hours in grid:
+            name = f"{n}x{hours}"
+            print(f"[bench] {name} …", flush=True)
+            results[name] = r = run_scenario(args, base_url, n, hours)
+            for phase in ("cold", "warm"):
+                x = r[phase]
+                print(f"  {phase:4s} {x['wall_s']:7.2f}s  {x['peak_rss_mb']:7.1f} MB  "
+                      f"{x.get('requests', '?')} req  {x.get('mb', '?')} MB")
+    finally:
+        server.terminate(); server.wait()
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    config = {k: getattr(args, k) for k in ("snapshot", "latency", "missing", "fail", "gzip", "rate", "concurrency")}
+    if args.save:
+        scenarios = dict(baseline.get("scenarios", {}), **results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                                   "cpus": os.cpu_count()},
+                       "config": config, "scenarios": scenarios}, f, ensure_ascii=False, indent=1)
+        print(f"[bench] baseline 已更新 → {args.baseline}")
+        return
+
+    if baseline and baseline.get("config") != config:
+        print(f"[warn] 參數與 baseline 不同，比較僅供參考：{baseline.get('config')} vs {config}")
+    bad = compare(results, baseline, args.tolerance)
+    for name, phase, k, ref, cur in bad:
+        print(f"[regress] {name} {phase} {k}: {ref} → {cur}")
+    if not baseline:
+        print("[bench] 沒有 baseline 可比較（用 --save 建立）")
+    elif not bad:
+        print(f"[bench] 沒有超過 {args.tolerance:.0%} 的退步")
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os, sys
+
+# app/ 底下的模組彼此用扁平 import（同 python -m app）
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -0,0 +1,62 @@
+import threading, http.client
+import numpy as np
+from api_server import lttb, minmax_buckets, _width, gzip_etag, make_server, SeriesService
+from derived import DerivedStore
+from station_store import StationStore, to_hour
+
+def test_lttb_small_inputs_keep_everything():
+    x = np.arange(5, dtype=float)
+    for n in (2, 5, 6, 100):                     # n < 3 或 n >= 點數：原樣回傳
+        assert lttb(x, x, n).tolist() == [0, 1, 2, 3, 4]
+
+def test_lttb_keeps_edges_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[337], y[612] = 40.0, -40.0                 # 單點尖峰
+    idx = lttb(x, y, 50)
+    assert len(idx) == 50 and idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert 337 in idx and 612 in idx
+
+def test_minmax_keeps_extremes_and_rain_total():
+    start = to_hour("2026-10-01T00:00:00+08:00")
+    hours = np.arange(start, start + 24 * 7)
+    temp = 20 + 5 * np.sin(np.arange(len(hours)) / 6)
+    temp[0], temp[-1], temp[50] = -3.0, 41.0, np.nan
+    rain = np.where(np.arange(len(hours)) % 5 == 0, 1.5, 0.0)
+    width = _width(hours[0], hours[-1], 20)
+    starts, agg = minmax_buckets(hours, {"temp": temp, "rain": rain}, width)
+    assert len(starts) <= 20
+    assert np.nanmin(agg["temp_min"]) == -3.0 and agg["temp_min"][0] == -3.0      # 頭尾的格子也保住
+    assert np.nanmax(agg["temp_max"]) == 41.0 and agg["temp_max"][-1] == 41.0
+    assert np.isclose(agg["rain"].sum(), rain.sum())
+
+def test_width_is_one_hour_when_points_suffice():
+    h = to_hour("2026-10-01T00:00:00+08:00")
+    assert _width(h, h + 99, 100) == 1 and _width(h, h + 100, 100) == 2
+
+def test_gzip_and_identity_get_distinct_etags(tmp_path):
+    store = StationStore(str(tmp_path / "store"), legacy_csv=None)
+    h = to_hour("2026-10-01T00:00:00+08:00")
+    store.upsert_arrays("C0F9N0", np.arange(h, h + 48), temp=np.full(48, 25.0), rh=np.full(48, 80.0),
+                        precip=np.zeros(48))
+    service = SeriesService([{"sid": "C0F9N0"}], store, DerivedStore(str(tmp_path / "derived")))
+    srv = make_server("127.0.0.1", 0, service)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        def get(**headers):
+            c = http.client.HTTPConnection("127.0.0.1", srv.server_address[1])
+            c.request("GET", "/api/series?sids=C0F9N0", headers=headers)
+            r = c.getresponse(); r.read(); c.close()
+            return r
+
+        plain, gz = get(), get(**{"Accept-Encoding": "gzip"})
+        assert gz.getheader("Content-Encoding") == "gzip" and plain.getheader("Content-Encoding") is None
+        assert gz.getheader("ETag") == gzip_etag(plain.getheader("ETag")) != plain.getheader("ETag")
+        assert plain.getheader("Vary") == gz.getheader("Vary") == "Accept-Encoding"
+        again = get(**{"Accept-Encoding": "gzip", "If-None-Match": gz.getheader("ETag")})
+        assert again.status == 304 and again.getheader("ETag") == gz.getheader("ETag")
+        assert again.getheader("Vary") == "Accept-Encoding"
+        assert get(**{"If-None-Match": plain.getheader("ETag")}).status == 304
+    finally:
+        srv.shutdown(); srv.server_close()
@@ -0,0 +1,17 @@
+import os
+os.environ.setdefault("CWA_TOKEN", "test")      # ci_update 匯入時就要讀
+from ci_update import export_station
+from derived import DerivedStore
+from station_store import StationStore, to_hour
+
+def test_station_without_rows_is_not_exported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store, derived = StationStore("store", legacy_csv=None), DerivedStore("derived")
+    os.makedirs("docs/data"); open("docs/data/G2f820.json", "w").close()     # 上一版輸出的空檔
+    path, latest, wrote = export_station(store, "G2f820", "臺中市", "霧峰區", "農試所(霧峰)", derived=derived)
+    assert (latest, wrote) == (None, False) and not os.path.exists(path)
+
+    h = to_hour("2026-10-18T06:00:00+08:00")
+    store.upsert_arrays("C0F9N0", [h], temp=[25.0], rh=[80.0], precip=[0.0])
+    path, latest, wrote = export_station(store, "C0F9N0", "臺中市", "大里區", "大里", h, derived=derived)
+    assert wrote and os.path.exists(path) and str(latest) == "2026-10-18 06:00:00+08:00"
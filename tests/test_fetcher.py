@@ -0,0 +1,81 @@
+import time, asyncio, pytest, requests
+import fetcher
+from fetcher import FetchEngine, TokenBucket
+
+def _resp(code, **headers):
+    r = requests.Response()
+    r.status_code, r.url, r._content = code, "http://cwa.test/x", b"{}"
+    r.headers.update(headers)
+    return r
+
+class StubSession:
+    """依序回傳預先排好的回應；記下每次請求的時間"""
+
+    def __init__(self, codes):
+        self.queue, self.calls = list(codes), []
+
+    def get(self, url, **kw):
+        self.calls.append(time.monotonic())
+        return self.queue.pop(0)
+
+    def close(self):
+        pass
+
+def _engine(codes, monkeypatch, **kw):
+    sleeps, real_sleep = [], asyncio.sleep
+
+    async def sleep(s):
+        sleeps.append(s)
+        await real_sleep(0)
+
+    monkeypatch.setattr(fetcher.asyncio, "sleep", sleep)
+    eng = FetchEngine(rate=0, **kw)
+    eng.session = StubSession(codes)
+    return eng, sleeps
+
+def test_retry_after_then_ok(monkeypatch):
+    eng, sleeps = _engine([_resp(429, **{"Retry-After": "3"}), _resp(200)], monkeypatch)
+    r = asyncio.run(eng.get("http://cwa.test/x"))
+    assert r.status_code == 200 and len(eng.session.calls) == 2
+    assert sleeps == [3.0]                                   # 照伺服器說的等，不自己猜
+    s = eng.stats.summary()
+    assert s["retries"] == 1 and s["status"] == {429: 1, 200: 1}
+
+def test_jittered_backoff_grows(monkeypatch):
+    eng, sleeps = _engine([_resp(503), _resp(503), _resp(503), _resp(200)], monkeypatch, backoff=0.5)
+    monkeypatch.setattr(fetcher.random, "uniform", lambda lo, hi: hi)     # 抖動取上限
+    assert asyncio.run(eng.get("http://cwa.test/x")).status_code == 200
+    assert sleeps == [0.5, 1.0, 2.0] and eng.stats.retries == 3
+
+def test_gives_up_after_retries(monkeypatch):
+    eng, sleeps = _engine([_resp(429)] * 3, monkeypatch, retries=2, backoff=0)
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(eng.get("http://cwa.test/x"))
+    assert len(eng.session.calls) == 3 and eng.stats.retries == 2
+
+def test_404_is_not_retried(monkeypatch):
+    eng, sleeps = _engine([_resp(404)], monkeypatch)
+    assert asyncio.run(eng.get("http://cwa.test/x")).status_code == 404 and not sleeps
+
+def test_token_bucket_paces_requests():
+    eng = FetchEngine(concurrency=4, rate=20, burst=2)
+    eng.session = StubSession([_resp(200)] * 6)
+
+    async def run():
+        await asyncio.gather(*(eng.get("http://cwa.test/x") for _ in range(6)))
+
+    asyncio.run(run())
+    calls = sorted(eng.session.calls)
+    # 前 2 個靠桶裡的令牌立刻送出，之後每 1/20 秒一個：6 個至少要 (6-2)/20 = 0.2 秒
+    assert calls[-1] - calls[0] >= 0.2 * 0.9
+    assert calls[1] - calls[0] < 0.05
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(rate=0)
+
+    async def run():
+        await asyncio.gather(*(bucket.acquire() for _ in range(100)))
+
+    t0 = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - t0 < 0.5
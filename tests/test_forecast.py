@@ -0,0 +1,49 @@
+from datetime import datetime
+import forecast
+
+def _locs(start):
+    block = lambda v: [{"startTime": start, "endTime": "2026-10-19T00:00:00+08:00", "elementValue": [{"value": v}]}]
+    return [{"locationName": "大里區", "weatherElement": [{"elementName": "T", "time": block("25")},
+                                                         {"elementName": "RH", "time": block("70")}]}]
+
+def test_issued_at_is_earliest_start():
+    locs = _locs("2026-10-18T12:00:00+08:00") + _locs("2026-10-18T09:00:00+08:00")
+    assert forecast.issued_at(locs) == "2026-10-18T09:00:00+08:00"
+
+def test_late_issue_is_refetched_until_it_advances(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, "FORECAST_CACHE_DIR", str(tmp_path))
+    served = [_locs("2026-10-18T06:00:00+08:00")] * 2 + [_locs("2026-10-18T12:00:00+08:00")]
+    calls = []
+    monkeypatch.setattr(forecast, "fetch_city", lambda ds, towns: calls.append(1) or served[len(calls) - 1])
+    get = lambda now: forecast.city_hourly("F-D0047-073", {"大里區"}, datetime.fromisoformat(now))
+
+    get("2026-10-18T06:10:00+08:00")          # 05 時那一版
+    get("2026-10-18T07:00:00+08:00")          # 同一個 slot：用快取
+    assert len(calls) == 1
+    get("2026-10-18T12:00:00+08:00")          # 11 時的 slot，但 CWA 還沒發布：拿到舊版
+    get("2026-10-18T13:00:00+08:00")          # 沒前進就再問一次 → 新版
+    get("2026-10-18T14:00:00+08:00")          # 之後才用快取
+    assert len(calls) == 3
+    assert forecast._load_cache("F-D0047-073")["issued"] == "2026-10-18T12:00:00+08:00"
+
+def test_naive_times_are_taipei_wall_time():
+    block = lambda s, e: [{"startTime": s, "endTime": e, "elementValue": [{"value": "25"}]}]
+    locs = [{"locationName": "大里區", "weatherElement": [
+        {"elementName": "T", "time": block("2026-10-18 06:00:00", "2026-10-18 09:00:00")},
+        {"elementName": "RH", "time": block("2026-10-18T06:00:00+08:00", "2026-10-18T09:00:00+08:00")}]}]
+    pts = forecast._expand_locations(locs)["大里區"]
+    assert [p[0] for p in pts] == [f"2026-10-18T0{h}:00:00+08:00" for h in (6, 7, 8)]
+    assert all(p[1] == 25.0 and p[2] == 25.0 for p in pts)
+
+def test_issued_at_mixes_naive_and_aware():
+    locs = _locs("2026-10-18T12:00:00+08:00") + _locs("2026-10-18 09:00:00")
+    assert forecast.issued_at(locs) == "2026-10-18T09:00:00+08:00"
+    assert forecast.issued_at(_locs("2026-10-18 09:00:00")) == forecast.issued_at(_locs("2026-10-18T01:00:00Z"))
+
+def test_offline_uses_cache_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, "FORECAST_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(forecast, "fetch_city", lambda ds, towns: (_ for _ in ()).throw(AssertionError("fetched")))
+    now = datetime.fromisoformat("2026-10-18T12:00:00+08:00")
+    assert forecast.city_hourly("F-D0047-073", {"大里區"}, now, fetch=False) == {}
+    forecast._save_cache("F-D0047-073", {"slot": "old", "towns": [], "hourly": {"大里區": []}})
+    assert forecast.city_hourly("F-D0047-073", {"大里區"}, now, fetch=False) == {"大里區": []}
@@ -0,0 +1,11 @@
+import metrics
+
+def test_samples_are_capped_but_totals_keep_counting(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_SAMPLES", 5)
+    m = metrics.RunMetrics()
+    for i in range(100):
+        m.observe("daemon_lag_s", float(i))
+    assert len(m.samples[("daemon_lag_s", ())]) == 5
+    d = m.report()["distributions"]["daemon_lag_s"]["total"]
+    assert d["n"] == 100 and d["sum"] == 4950 and d["p50"] >= 95          # 百分位只看最近幾筆
+    assert "cwa_daemon_lag_s_count 100" in m.prometheus()
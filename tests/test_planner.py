@@ -0,0 +1,29 @@
+import math
+from planner import AbsentIndex, missing_hours
+from station_store import StationStore, hour_to_dt
+
+ROW = {"Temperature": 25.0, "RH": 80.0}
+
+def test_absent_hours_are_not_refetched(tmp_path):
+    store = StationStore(str(tmp_path), legacy_csv=None)
+    wanted = [hour_to_dt(h) for h in range(500000, 500010)]
+    absent = AbsentIndex(str(tmp_path / "absent.json"))
+    for dt in wanted:
+        absent.record(dt, {"C0F9N0": ROW}, ["C0F9N0", "G2f820"])
+    absent.save()
+
+    skip = AbsentIndex(str(tmp_path / "absent.json")).hours
+    assert "C0F9N0" not in skip
+    # 只剩最後 lookback 小時照樣重抓
+    assert missing_hours(store, "G2f820", wanted, 3, skip["G2f820"]) == wanted[-3:]
+
+def test_absent_ignores_empty_snapshots_and_clears_on_report(tmp_path):
+    absent = AbsentIndex("")
+    dt = hour_to_dt(500000)
+    absent.record(dt, {}, ["C0G730"])                            # 404 / 還沒發布：不算看過
+    assert absent.hours == {}
+    absent.record(dt, {"C0G730": {"Temperature": math.nan, "RH": 70.0}}, ["C0G730"])
+    assert absent.hours == {"C0G730": {500000}}                  # 只回特殊代碼也算缺
+    absent.record(dt, {"C0G730": ROW}, ["C0G730"])               # 事後更正補上了
+    absent.prune(500000)
+    assert absent.hours == {}
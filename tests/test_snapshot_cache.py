@@ -0,0 +1,31 @@
+import time
+from datetime import datetime, timedelta
+from snapshot_cache import SnapshotCache
+from station_store import TZ
+
+OLD = datetime(2020, 1, 1, 5, tzinfo=TZ)          # 回補下來的舊觀測
+
+def test_backfilled_snapshot_survives_close(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_mb=1, max_age_days=60)
+    cache.put("O-A0001-001", OLD, b'{"records": {}}')
+    cache.close()
+    assert cache.get("O-A0001-001", OLD) == b'{"records": {}}'
+    assert "O-A0001-001/2020010105" in SnapshotCache(str(tmp_path)).index      # index 已寫回
+
+def test_eviction_runs_on_close_not_on_put(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_mb=0, max_age_days=60)             # 容量 0：整理時全丟
+    hours = [OLD + timedelta(hours=i) for i in range(3)]
+    for dt in hours:
+        cache.put("O-A0001-001", dt, b"x" * 1000)
+    assert all(cache.get("O-A0001-001", dt) for dt in hours)
+    cache.close()
+    assert not any(cache.get("O-A0001-001", dt) for dt in hours)
+
+def test_unused_entries_age_out(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_mb=1, max_age_days=1)
+    cache.put("O-A0001-001", OLD, b"a")
+    cache.put("O-A0001-001", OLD + timedelta(hours=1), b"b")
+    cache.index["O-A0001-001/2020010105"]["used"] = time.time() - 2 * 86400     # 兩天沒人用
+    cache.close()
+    assert cache.get("O-A0001-001", OLD) is None
+    assert cache.get("O-A0001-001", OLD + timedelta(hours=1)) == b"b"
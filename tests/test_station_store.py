@@ -0,0 +1,51 @@
+import numpy as np
+from station_store import StationStore, to_hour
+
+def test_sentinels_read_as_missing(tmp_path):
+    store = StationStore(str(tmp_path), legacy_csv=None)
+    h = to_hour("2025-09-18T05:00:00")
+    store.upsert_arrays("C0G730", [h, h + 1], temp=[25.1, -99.0], rh=[80, -99], precip=[0.5, -998])
+    hours, recs = store.read("C0G730")
+    assert hours.tolist() == [h, h + 1]                    # 仍算有資料的小時，只是值為缺
+    assert recs["temp"][0] == 25.1 and np.isnan(recs["temp"][1])
+    assert np.isnan(recs["rh"][1]) and np.isnan(recs["precip"][1])
+
+def test_derived_store_keeps_negative_values(tmp_path):
+    store = StationStore(str(tmp_path), legacy_csv=None, sentinels=False)
+    store.upsert_arrays("X", [0], temp=[-99.0], rh=[1], precip=[0])
+    assert store.read("X")[1]["temp"][0] == -99.0
+
+def test_upsert_across_month_boundary(tmp_path):
+    store = StationStore(str(tmp_path), legacy_csv=None)
+    h = to_hour("2025-09-30T22:00:00+08:00")                # 台北時間的月界，不是 UTC 的
+    store.upsert_arrays("C0F9N0", [h, h + 1, h + 2, h + 3], temp=[1, 2, 3, 4], rh=[50] * 4, precip=[0] * 4)
+    assert store.months("C0F9N0") == [(2025, 9), (2025, 10)]
+    assert sorted(p.name for p in (tmp_path / "C0F9N0").iterdir()) == ["2025-09.bin", "2025-10.bin"]
+    hours, recs = store.read("C0F9N0", h + 1, h + 2)
+    assert hours.tolist() == [h + 1, h + 2] and recs["temp"].tolist() == [2, 3]
+    # 跨月覆寫其中兩格，其他格不動
+    store.upsert_arrays("C0F9N0", [h + 1, h + 2], temp=[20, 30], rh=[60, 60], precip=[1, 1])
+    assert store.read("C0F9N0")[1]["temp"].tolist() == [1, 20, 30, 4]
+    assert store.last_hour("C0F9N0") == h + 3
+
+def test_first_read_migrates_legacy_csv(tmp_path):
+    legacy = tmp_path / "C0G730_hourly.csv"
+    legacy.write_text("DateTime,Temperature,RH,Precip\n"
+                      "2025-09-30T23:00:00+08:00,24.5,88,0.0\n"
+                      "2025-10-01T00:00:00+08:00,-99,,-998\n", encoding="utf-8")
+    store = StationStore(str(tmp_path / "store"), legacy_csv=str(tmp_path / "{sid}_hourly.csv"))
+    hours, recs = store.read("C0G730")
+    h = to_hour("2025-09-30T23:00:00+08:00")
+    assert hours.tolist() == [h, h + 1]
+    assert recs["temp"][0] == 24.5 and np.isnan(recs["temp"][1]) and np.isnan(recs["rh"][1])
+    # 已轉過：CSV 之後的改動不會再被讀進來
+    legacy.write_text("DateTime,Temperature,RH,Precip\n2025-10-02T00:00:00+08:00,1,1,1\n", encoding="utf-8")
+    assert len(StationStore(str(tmp_path / "store"), legacy_csv=str(tmp_path / "{sid}_hourly.csv")).read("C0G730")[0]) == 2
+
+def test_sentinel_round_trip(tmp_path):
+    store = StationStore(str(tmp_path), legacy_csv=None)
+    store.upsert("C0I380", [{"DateTime": "2025-09-18T05:00:00+08:00", "Temperature": -90.0, "RH": -89.9, "Precip": -999.0}])
+    raw = StationStore(str(tmp_path), legacy_csv=None, sentinels=False).read("C0I380")[1]
+    assert raw["temp"][0] == -90.0 and raw["precip"][0] == -999.0           # 檔案裡原樣保存
+    recs = store.read("C0I380")[1]
+    assert np.isnan(recs["temp"][0]) and np.isnan(recs["precip"][0]) and recs["rh"][0] == -89.9
@@ -0,0 +1,63 @@
+import json
+from stream_extract import StationExtractor, extract_stream
+
+def _station(sid, t):
+    return {"StationName": "測站" + sid, "StationId": sid,
+            "WeatherElement": {"AirTemperature": str(t), "RelativeHumidity": "80", "Now": {"Precipitation": "0.0"}}}
+
+STATIONS = [_station(f"C0A{i:03d}", 20 + i) for i in range(5)]
+WANT = {"C0A001", "C0A003"}
+EXPECT = {s["StationId"]: s for s in STATIONS if s["StationId"] in WANT}
+
+def _records():
+    return json.dumps({"success": "true", "records": {"Station": STATIONS}}, ensure_ascii=False).encode()
+
+def _opendata():
+    body = {"cwaopendata": {"dataset": {"Station": STATIONS}}}
+    return b"\xef\xbb\xbf" + json.dumps(body, ensure_ascii=False, indent=1).encode()
+
+def _xml():
+    def el(tag, v):
+        if isinstance(v, dict):
+            return f"<{tag}>" + "".join(el(k, x) for k, x in v.items()) + f"</{tag}>"
+        return f"<{tag}>{v}</{tag}>"
+    body = "".join(el("Station", s) for s in STATIONS)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<cwaopendata xmlns="urn:cwa:gov:tw:cwacommon:0.1">'
+            f"<dataset>{body}</dataset></cwaopendata>").encode()
+
+def _run(chunks, sids=WANT):
+    ex = StationExtractor(sids)
+    for c in chunks:
+        if ex.feed(c):
+            break
+    return ex.close()
+
+def test_every_split_offset():
+    for make in (_records, _opendata, _xml):
+        data = make()
+        for k in range(len(data) + 1):
+            assert _run([data[:k], data[k:]]) == EXPECT, (make.__name__, k)
+        assert _run([data[i:i + 1] for i in range(len(data))]) == EXPECT, make.__name__
+
+def test_single_station_object():
+    data = json.dumps({"records": {"Station": STATIONS[1]}}, ensure_ascii=False).encode()
+    for k in range(len(data) + 1):
+        assert _run([data[:k], data[k:]], {"c0a001"}) == {"C0A001": STATIONS[1]}
+
+def test_missing_station_and_long_buffer():
+    many = [_station(f"B{i:05d}", 25) for i in range(2000)]
+    data = json.dumps({"records": {"Station": many}}, ensure_ascii=False).encode()
+    found = _run((data[i:i + 1000] for i in range(0, len(data), 1000)), {"B01999", "NOPE00"})
+    assert list(found) == ["B01999"]
+
+def test_stops_once_all_found():
+    for make in (_records, _opendata, _xml):
+        data = make()
+        cut = data.index(b"C0A003") + 200          # 第二個要的測站之後不遠
+
+        def chunks():
+            yield data[:cut]
+            yield data[cut:cut + 300]
+            raise AssertionError("讀到要的測站之後還在讀")
+
+        assert extract_stream(chunks(), WANT) == EXPECT, make.__name__
@@ -0,0 +1,27 @@
+import numpy as np
+from tiers import hourly_rain
+
+def h(local_hour):
+    """台北時間某日 local_hour 時的 epoch 小時"""
+    return 24 * 20000 - 8 + local_hour
+
+def test_difference_of_running_total():
+    assert np.allclose(hourly_rain([h(10), h(11), h(12)], [1.0, 2.5, 2.5]), [np.nan, 1.5, 0.0], equal_nan=True)
+
+def test_sentinel_poisons_both_neighbours():
+    # -99 那一小時與下一小時都算不出來，不能把當日累積整筆當成下一小時的雨量
+    out = hourly_rain([h(10), h(11), h(12), h(13)], [1, 2, -99, 5])
+    assert np.allclose(out, [np.nan, 1, np.nan, np.nan], equal_nan=True)
+
+def test_missing_previous_hour():
+    out = hourly_rain([h(10), h(12)], [1.0, 3.0])
+    assert np.isnan(out).all()
+
+def test_first_hour_of_day_is_its_own_total():
+    out = hourly_rain([h(0), h(1), h(2)], [30.0, 2.0, 2.5])
+    assert np.allclose(out, [np.nan, 2.0, 0.5], equal_nan=True)
+    # 前一小時缺也一樣：台北 01 時的累積就是這一小時
+    assert np.allclose(hourly_rain([h(1)], [4.0]), [4.0])
+
+def test_empty():
+    assert len(hourly_rain([], [])) == 0